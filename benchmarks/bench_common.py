@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Shared setup for the benchmarks that need pygame: an offscreen display via
+# SDL's dummy drivers, and a throwaway score database so runs never touch the
+# player's scores.db.
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+def open_display():
+    import pygame
+    from snake_game import WINDOW_WIDTH, WINDOW_HEIGHT, init_pygame
+
+    init_pygame()
+    return pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+
+
+def make_game(*board):
+    # board: optional (width, height, cell size), as Game takes them
+    from snake_game import Game
+    from snake_scores import ScoreStore
+
+    directory = tempfile.mkdtemp(prefix="snake-bench-")
+    return Game(ScoreStore(os.path.join(directory, "scores.db")), *board)
+
+
+def close_game(game):
+    game.scores.close()
+    os.remove(game.scores.path)
+    os.rmdir(os.path.dirname(game.scores.path))
+
+
+def summarize(seconds):
+    # Mean and percentiles of a list of timings, in milliseconds
+    values = sorted(seconds)
+    if not values:
+        return {}
+
+    def at(fraction):
+        return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 4)
+
+    return {"mean_ms": round(sum(values) / len(values) * 1000, 4),
+            "p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99),
+            "samples": len(values)}
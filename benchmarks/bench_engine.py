@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snake_engine import SnakeEngine, CELL_NUMBER_X, CELL_NUMBER_Y
+from snake_autopilot import hamiltonian_cycle
+
+# Headless ticks/sec as the snake grows from 3 cells to the whole board.
+# The snake follows a Hamiltonian cycle so it never dies and never eats,
+# which keeps its length fixed for each measurement.
+
+TICKS = 200000
+QUICK_TICKS = 20000
+
+
+def place_on_cycle(engine, length):
+    # Lays a snake of `length` along the cycle; returns the direction to take
+    # from every cell to stay on it
+    cycle = hamiltonian_cycle(engine.width, engine.height)
+    # Head at the end of the cycle prefix, body trailing behind it
+    body = cycle[length - 1::-1]
+    next_direction = [None] * (engine.width * engine.height)
+    for i, (x, y) in enumerate(cycle):
+        nx, ny = cycle[(i + 1) % len(cycle)]
+        next_direction[engine.cell(x, y)] = (nx - x, ny - y)
+    engine.set_body(body, next_direction[engine.cell(*body[0])])
+    return next_direction
+
+
+def make_engine(length):
+    engine = SnakeEngine()
+    return engine, place_on_cycle(engine, length)
+
+
+def bench_length(length, ticks=TICKS):
+    engine, next_direction = make_engine(length)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        engine.direction = next_direction[engine.body[0]]
+        engine.move()
+        if engine.collided():
+            raise RuntimeError("snake died during benchmark")
+    return ticks / (time.perf_counter() - start)
+
+
+def lengths():
+    board = CELL_NUMBER_X * CELL_NUMBER_Y
+    return (3, 10, 100, 250, board // 2, 750, board - 1, board)
+
+
+def run(quick=False):
+    ticks = QUICK_TICKS if quick else TICKS
+    return {"ticks": ticks,
+            "ticks_per_sec": {str(length): round(bench_length(length, ticks)) for length in lengths()}}
+
+
+def main():
+    print(f"{'length':>8} {'ticks/sec':>12}")
+    for length in lengths():
+        print(f"{length:>8} {bench_length(length):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import bench_common
+from bench_engine import place_on_cycle
+
+from snake_game import BACKGROUND
+
+# Peak memory of one long game played through Game.update, the way main()
+# runs it: the snake follows a Hamiltonian cycle (so it eats everything and
+# never dies) with replay recording on, and a frame is drawn every DRAW_EVERY
+# ticks so render caches are included.
+
+TICKS = 100000
+QUICK_TICKS = 10000
+DRAW_EVERY = 50
+
+
+def run(quick=False):
+    max_ticks = QUICK_TICKS if quick else TICKS
+    screen = bench_common.open_display()
+    game = bench_common.make_game()
+    game.reset_game(seed=1)
+    next_direction = place_on_cycle(game.engine, 3)
+    game.engine.place_food()
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    ticks = 0
+    while not game.engine.done and ticks < max_ticks:
+        game.queue_turn(next_direction[game.engine.head])
+        game.update()
+        ticks += 1
+        if ticks % DRAW_EVERY == 0:
+            screen.fill(BACKGROUND)
+            game.draw_elements(screen)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    replay = game.recorder.replay if game.recorder else game.last_replay
+    results = {"ticks": ticks,
+               "final_length": len(game.engine.body),
+               "won": game.engine.won,
+               "ticks_per_sec": round(ticks / elapsed),
+               "traced_peak_kb": round((peak - baseline) / 1024, 1),
+               "traced_end_kb": round((current - baseline) / 1024, 1),
+               "replay_bytes": len(replay.to_bytes())}
+    if resource:
+        # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+        results["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    bench_common.close_game(game)
+    return results
+
+
+def main():
+    for key, value in run().items():
+        print(f"{key:>16}: {value}")
+
+
+if __name__ == "__main__":
+    main()
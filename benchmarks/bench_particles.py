@@ -0,0 +1,57 @@
+import random
+import time
+
+import bench_common
+
+from snake_game import SpriteCache, PARTICLE_COLORS, PARTICLE_LIFE, PARTICLES_PER_FOOD, WINDOW_WIDTH, WINDOW_HEIGHT
+from snake_particles import ParticleSystem
+
+# Cost of food bursts: emitting N simultaneous bursts, then updating and
+# drawing the particles over their whole lifetime.
+
+BURSTS = (1, 10, 50, 250)
+REPEATS = 10
+QUICK_REPEATS = 2
+
+
+def bench_bursts(screen, sprites, bursts, repeats):
+    particles = ParticleSystem(PARTICLE_COLORS, max_life=PARTICLE_LIFE)
+    particles.seed(bursts)
+    positions = random.Random(bursts)
+    emit_times, update_times, draw_times = [], [], []
+    clock = time.perf_counter
+    for _ in range(repeats):
+        start = clock()
+        for _ in range(bursts):
+            particles.emit(positions.uniform(0, WINDOW_WIDTH), positions.uniform(100, WINDOW_HEIGHT),
+                           PARTICLES_PER_FOOD)
+        emit_times.append(clock() - start)
+        while len(particles):
+            start = clock()
+            particles.update()
+            update_times.append(clock() - start)
+            start = clock()
+            particles.draw(screen, sprites)
+            draw_times.append(clock() - start)
+    return {"particles": bursts * PARTICLES_PER_FOOD,
+            "emit": bench_common.summarize(emit_times),
+            "update": bench_common.summarize(update_times),
+            "draw": bench_common.summarize(draw_times)}
+
+
+def run(quick=False):
+    screen = bench_common.open_display()
+    sprites = SpriteCache()
+    repeats = QUICK_REPEATS if quick else REPEATS
+    return {str(bursts): bench_bursts(screen, sprites, bursts, repeats) for bursts in BURSTS}
+
+
+def main():
+    print(f"{'bursts':>7} {'particles':>10} {'emit':>8} {'update':>8} {'draw':>8} ms (mean per frame)")
+    for bursts, stats in run().items():
+        print(f"{bursts:>7} {stats['particles']:>10} {stats['emit']['mean_ms']:>8.3f} "
+              f"{stats['update']['mean_ms']:>8.3f} {stats['draw']['mean_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import time
+
+import bench_common
+from bench_engine import place_on_cycle
+from snake_engine import RIGHT
+
+import pygame
+from snake_game import DirtyRectRenderer, BACKGROUND, MENU, PLAYING, PAUSED, GAME_OVER
+
+# Frame render time for every game state on an offscreen (dummy driver)
+# display, for both the full redraw and the --dirty-rects path. A frame is
+# what main() does: clear, Game.draw_elements, present. The playing state is
+# also timed on larger boards, where only the cells in view should be drawn,
+# and with --dirty-rects on a board that scrolls, where every frame moves.
+# Dirty-rect runs also report the pixels pushed per frame.
+
+FRAMES = 500
+QUICK_FRAMES = 100
+WARMUP = 20
+SNAKE_LENGTH = 60
+STATES = {"MENU": MENU, "PLAYING": PLAYING, "PAUSED": PAUSED, "GAME_OVER": GAME_OVER}
+# (width, height, cell size)
+BOARDS = ((36, 24, 25), (200, 200, 25), (1000, 1000, 25), (150, 100, 6))
+SCROLLING_BOARD = (200, 200, 25)
+
+
+def setup_game(*board):
+    game = bench_common.make_game(*board)
+    game.reset_game(seed=1)
+    place_on_cycle(game.engine, SNAKE_LENGTH)
+    game.engine.place_food()
+    game.high_score = 120
+    return game
+
+
+def setup_scrolling_game(width, height, cell_size):
+    # A straight snake in the middle of the board, so the camera follows the
+    # interpolated head instead of resting against an edge
+    game = bench_common.make_game(width, height, cell_size)
+    game.reset_game(seed=1)
+    y = height // 2
+    head_x = width // 2 + SNAKE_LENGTH // 2
+    game.engine.set_body([(head_x - i, y) for i in range(SNAKE_LENGTH)], RIGHT)
+    game.engine.place_food()
+    # One tick, so there is a previous position to interpolate from
+    game.update()
+    game.high_score = 120
+    return game
+
+
+def render_frame(game, screen, renderer, alpha):
+    if renderer:
+        renderer.frame.fill(BACKGROUND)
+        game.draw_elements(renderer.frame, alpha)
+        renderer.draw_counter()
+        renderer.present(game.visible_buttons(), game.camera.offset())
+    else:
+        screen.fill(BACKGROUND)
+        game.draw_elements(screen, alpha)
+        pygame.display.flip()
+
+
+def bench_state(game, screen, renderer, state, frames):
+    game.state = state
+    for i in range(WARMUP):
+        render_frame(game, screen, renderer, 0.5)
+    times = []
+    pixels = 0
+    clock = time.perf_counter
+    for i in range(frames):
+        start = clock()
+        render_frame(game, screen, renderer, i % 10 / 10)
+        times.append(clock() - start)
+        if renderer:
+            pixels += renderer.pixels
+    stats = bench_common.summarize(times)
+    if renderer:
+        stats["pixels_per_frame"] = pixels // frames
+    return stats
+
+
+def run(quick=False):
+    frames = QUICK_FRAMES if quick else FRAMES
+    screen = bench_common.open_display()
+    game = setup_game()
+    results = {"frames": frames, "snake_length": SNAKE_LENGTH}
+    for mode in ("full", "dirty_rects"):
+        renderer = DirtyRectRenderer(screen) if mode == "dirty_rects" else None
+        results[mode] = {name: bench_state(game, screen, renderer, state, frames)
+                         for name, state in STATES.items()}
+    bench_common.close_game(game)
+
+    width, height, cell_size = SCROLLING_BOARD
+    game = setup_scrolling_game(width, height, cell_size)
+    results["dirty_rects"][f"PLAYING {width}x{height}"] = bench_state(
+        game, screen, DirtyRectRenderer(screen), PLAYING, frames)
+    bench_common.close_game(game)
+
+    results["boards"] = {}
+    for width, height, cell_size in BOARDS:
+        game = setup_game(width, height, cell_size)
+        results["boards"][f"{width}x{height}@{cell_size}"] = bench_state(game, screen, None, PLAYING, frames)
+        bench_common.close_game(game)
+    return results
+
+
+def main():
+    results = run()
+    print(f"{'mode':<12} {'state':<14} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} ms")
+    for mode in ("full", "dirty_rects"):
+        for name, stats in results[mode].items():
+            pixels = f" {stats['pixels_per_frame']:>9,} px" if "pixels_per_frame" in stats else ""
+            print(f"{mode:<12} {name:<14} {stats['mean_ms']:>8.3f} {stats['p50_ms']:>8.3f} "
+                  f"{stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f}{pixels}")
+    for board, stats in results["boards"].items():
+        print(f"{'board':<12} {board:<14} {stats['mean_ms']:>8.3f} {stats['p50_ms']:>8.3f} "
+              f"{stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_common
+
+# Launch latency. Each sample is a fresh interpreter: the game started with
+# --startup-time on the dummy display (it exits after its first frame), and
+# the bare imports of the game and of the headless modules for comparison.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 10
+QUICK_RUNS = 3
+IMPORTS = {
+    "import_engine": "import snake_engine",
+    "import_replay": "import snake_replay",
+    "import_game": "import snake_game",
+}
+
+
+def launch(args):
+    # Wall time of one interpreter run, and its stdout
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True,
+                            check=True)
+    return time.perf_counter() - start, result.stdout
+
+
+def bench_game(runs):
+    directory = tempfile.mkdtemp(prefix="snake-bench-")
+    scores = os.path.join(directory, "scores.db")
+    walls, stages = [], {}
+    for _ in range(runs):
+        wall, output = launch(["snake_game.py", "--startup-time", "--scores", scores])
+        walls.append(wall)
+        # "startup: imports 180 ms, display 4 ms, ..." as printed by the game
+        for stage, ms in re.findall(r"([a-z ]+?) (\d+) ms", output.split("startup:")[-1]):
+            stages.setdefault(stage.strip(), []).append(int(ms) / 1000)
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+    results = {"process": bench_common.summarize(walls)}
+    results.update((stage, bench_common.summarize(times)) for stage, times in stages.items())
+    return results
+
+
+def run(quick=False):
+    runs = QUICK_RUNS if quick else RUNS
+    results = {"game": bench_game(runs)}
+    for name, statement in IMPORTS.items():
+        results[name] = bench_common.summarize([launch(["-c", statement])[0] for _ in range(runs)])
+    return results
+
+
+def main():
+    results = run()
+    print(f"{'':<20} {'mean':>8} {'p50':>8} ms")
+    for name, stats in results["game"].items():
+        print(f"{'game ' + name:<20} {stats['mean_ms']:>8.1f} {stats['p50_ms']:>8.1f}")
+    for name in IMPORTS:
+        stats = results[name]
+        print(f"{name:<20} {stats['mean_ms']:>8.1f} {stats['p50_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
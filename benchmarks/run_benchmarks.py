@@ -0,0 +1,109 @@
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+
+import bench_common
+import bench_engine
+import bench_memory
+import bench_particles
+import bench_render
+import bench_startup
+
+# Runs every benchmark and writes the results as JSON, tagged with the commit
+# they were measured at, so two runs can be compared with --compare:
+#
+#   python benchmarks/run_benchmarks.py -o before.json
+#   git checkout my-branch
+#   python benchmarks/run_benchmarks.py -o after.json --compare before.json
+
+SUITES = {
+    "engine": bench_engine.run,
+    "render": bench_render.run,
+    "particles": bench_particles.run,
+    "memory": bench_memory.run,
+    "startup": bench_startup.run,
+}
+# Relative change beyond which --compare flags a result
+THRESHOLD = 0.10
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import numpy
+    import pygame
+
+    return {"commit": git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pygame": pygame.version.ver,
+            "numpy": numpy.__version__}
+
+
+def flatten(results, prefix=""):
+    # {"a": {"b": 1}} -> {"a.b": 1}, numbers only
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, current):
+    # Prints every metric that moved by more than THRESHOLD. Throughputs
+    # (per_sec) are better higher; times and sizes are better lower.
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    regressions = 0
+    print(f"Compared with {baseline['environment'].get('commit')}:")
+    for name in sorted(old.keys() & new.keys()):
+        if name.endswith("samples") or not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        if abs(change) < THRESHOLD:
+            continue
+        worse = change < 0 if "per_sec" in name else change > 0
+        regressions += worse
+        print(f"  {'WORSE' if worse else 'better':<6} {name}: {old[name]} -> {new[name]} ({change:+.0%})")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the snake benchmarks and save JSON results")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", metavar="PATH")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a fast check")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), help="run just these suites")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only or SUITES:
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = SUITES[name](args.quick)
+    report = {"environment": environment(), "quick": args.quick, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        raise SystemExit(1 if compare(baseline, report) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import random
+from collections import deque
+
+from snake_engine import SnakeEngine, CELL_NUMBER_X, CELL_NUMBER_Y, DIRECTIONS, LEFT, RIGHT, FOOD_SCORE
+from snake_input import InputQueue
+
+# Several snakes on one shared board, for the multiplayer server. The rules
+# are SnakeEngine's, ticked for every snake at once: a snake moves, eats food
+# under its new head and grows on its next move; it dies running into a wall
+# or into any body, its own or another's, and two heads meeting both die.
+# Dead snakes leave the board and respawn a few ticks later.
+#
+# Each step() returns what changed as a list of events, which is all a client
+# needs to keep its copy of the board in sync:
+#
+#   (MOVE, id, direction index, grew)   head moved; tail dropped unless grew
+#   (DIE, id)                           snake removed from the board
+#   (SPAWN, id, direction index, cells) snake placed, cells head first
+#   (FOOD_ADD, cell) / (FOOD_REMOVE, cell)
+#   (SCORE, id, score)
+#   (LEAVE, id)                         player gone for good
+
+MOVE = 0
+DIE = 1
+SPAWN = 2
+FOOD_ADD = 3
+FOOD_REMOVE = 4
+SCORE = 5
+LEAVE = 6
+
+SPAWN_LENGTH = 3
+RESPAWN_TICKS = 10
+SPAWN_ATTEMPTS = 50
+
+
+class ArenaSnake:
+    def __init__(self, player):
+        self.player = player
+        self.body = deque()
+        self.direction = RIGHT
+        self.new_block = False
+        self.alive = False
+        self.score = 0
+        # Ticks until the next spawn attempt
+        self.respawn = 0
+        # Direction changes waiting for their tick, queued and checked the
+        # same way as the single-player game's key presses
+        self.inputs = InputQueue()
+
+
+class Arena:
+    # Occupancy counts and the free-cell index work exactly as in SnakeEngine,
+    # whose take_cell and release_cell are reused as they are
+    take_cell = SnakeEngine.take_cell
+    release_cell = SnakeEngine.release_cell
+
+    def __init__(self, width=CELL_NUMBER_X, height=CELL_NUMBER_Y, foods=None, rng=None):
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else random.Random()
+        size = width * height
+        self.occupied = bytearray(size)
+        self.free = list(range(size))
+        self.free_index = list(range(size))
+        self.free_count = size
+        self.foods = set()
+        # A fixed number of foods, or one per two players plus one
+        self.food_target = foods
+        self.snakes = {}
+        self.next_player = 1
+        self.left = []
+        self.tick = 0
+
+    def join(self):
+        # Adds a player; its snake appears on the next step()
+        player = self.next_player
+        self.next_player += 1
+        self.snakes[player] = ArenaSnake(player)
+        return player
+
+    def leave(self, player):
+        # Removes a player at the next step()
+        if player in self.snakes:
+            self.left.append(player)
+
+    def queue_turn(self, player, direction):
+        snake = self.snakes.get(player)
+        if snake is not None and snake.alive:
+            snake.inputs.push(direction, snake.direction)
+
+    def occupy(self, cell):
+        if not self.occupied[cell]:
+            self.take_cell(cell)
+        self.occupied[cell] += 1
+
+    def vacate(self, cell):
+        self.occupied[cell] -= 1
+        if not self.occupied[cell]:
+            self.release_cell(cell)
+
+    def remove_body(self, snake):
+        for cell in snake.body:
+            self.vacate(cell)
+        snake.body.clear()
+        snake.alive = False
+
+    def spawn(self, snake, events):
+        # A straight snake on free cells, heading away from the nearer side
+        # wall with room ahead; gives up (for now) on a crowded board
+        width = self.width
+        for _ in range(SPAWN_ATTEMPTS):
+            if self.free_count == 0:
+                return False
+            head = self.free[self.rng.randrange(self.free_count)]
+            y, x = divmod(head, width)
+            direction = RIGHT if x < width // 2 else LEFT
+            dx = direction[0]
+            xs = [x - dx * i for i in range(-1, SPAWN_LENGTH)]
+            if not all(0 <= cx < width for cx in xs):
+                continue
+            cells = [y * width + cx for cx in xs]
+            if any(self.occupied[cell] or cell in self.foods for cell in cells):
+                continue
+            # cells[0] is the free cell ahead of the head
+            snake.body.extend(cells[1:])
+            for cell in snake.body:
+                self.occupy(cell)
+            snake.direction = direction
+            snake.new_block = False
+            snake.alive = True
+            snake.score = 0
+            snake.inputs.clear()
+            events.append((SPAWN, snake.player, DIRECTIONS.index(direction), list(snake.body)))
+            events.append((SCORE, snake.player, 0))
+            return True
+        return False
+
+    def place_foods(self, events):
+        target = self.food_target or len(self.snakes) // 2 + 1
+        while len(self.foods) < target and self.free_count > len(self.foods):
+            cell = self.free[self.rng.randrange(self.free_count)]
+            if cell not in self.foods:
+                self.foods.add(cell)
+                events.append((FOOD_ADD, cell))
+
+    def step(self):
+        # One tick for every snake; returns the events
+        self.tick += 1
+        events = []
+        for player in self.left:
+            snake = self.snakes.pop(player, None)
+            if snake is not None:
+                if snake.alive:
+                    self.remove_body(snake)
+                events.append((LEAVE, player))
+        self.left = []
+
+        # Work out every move before changing the board, so all snakes move
+        # at the same time
+        width, height = self.width, self.height
+        movers = []
+        dead = []
+        for snake in self.snakes.values():
+            if not snake.alive:
+                continue
+            direction = snake.inputs.pop(snake.direction)
+            if direction is not None:
+                snake.direction = direction
+            y, x = divmod(snake.body[0], width)
+            x += snake.direction[0]
+            y += snake.direction[1]
+            if 0 <= x < width and 0 <= y < height:
+                movers.append((snake, y * width + x))
+            else:
+                dead.append(snake)
+
+        # Tails first, so a head may take a cell a tail is leaving this tick
+        for snake, head in movers:
+            grew = snake.new_block
+            if grew:
+                snake.new_block = False
+            else:
+                self.vacate(snake.body.pop())
+            events.append((MOVE, snake.player, DIRECTIONS.index(snake.direction), grew))
+        for snake, head in movers:
+            snake.body.appendleft(head)
+            self.occupy(head)
+
+        for snake, head in movers:
+            if self.occupied[head] > 1:
+                dead.append(snake)
+            elif head in self.foods:
+                self.foods.discard(head)
+                events.append((FOOD_REMOVE, head))
+                snake.new_block = True
+                snake.score += FOOD_SCORE
+                events.append((SCORE, snake.player, snake.score))
+
+        for snake in dead:
+            self.remove_body(snake)
+            snake.respawn = RESPAWN_TICKS
+            events.append((DIE, snake.player))
+
+        for snake in self.snakes.values():
+            if not snake.alive:
+                if snake.respawn > 0:
+                    snake.respawn -= 1
+                elif not self.spawn(snake, events):
+                    snake.respawn = RESPAWN_TICKS
+        self.place_foods(events)
+        return events
+
+    def snapshot(self):
+        # Events that rebuild the current board from an empty one
+        events = []
+        for snake in self.snakes.values():
+            if snake.alive:
+                events.append((SPAWN, snake.player, DIRECTIONS.index(snake.direction), list(snake.body)))
+                events.append((SCORE, snake.player, snake.score))
+        events.extend((FOOD_ADD, cell) for cell in self.foods)
+        return events
+
+    def total_length(self):
+        return sum(len(snake.body) for snake in self.snakes.values())
+
+
+class ArenaView:
+    # A client's copy of the board, kept in sync by applying events
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.bodies = {}
+        self.directions = {}
+        self.scores = {}
+        self.foods = set()
+        self.occupied = bytearray(width * height)
+
+    def apply(self, events):
+        width = self.width
+        for event in events:
+            kind = event[0]
+            if kind == MOVE:
+                _, player, direction, grew = event
+                body = self.bodies[player]
+                dx, dy = DIRECTIONS[direction]
+                head = body[0] + dy * width + dx
+                if not grew:
+                    self.occupied[body.pop()] -= 1
+                body.appendleft(head)
+                self.occupied[head] += 1
+                self.directions[player] = DIRECTIONS[direction]
+            elif kind == SPAWN:
+                _, player, direction, cells = event
+                self.bodies[player] = deque(cells)
+                self.directions[player] = DIRECTIONS[direction]
+                for cell in cells:
+                    self.occupied[cell] += 1
+            elif kind == DIE or kind == LEAVE:
+                for cell in self.bodies.pop(event[1], ()):
+                    self.occupied[cell] -= 1
+                self.directions.pop(event[1], None)
+                if kind == LEAVE:
+                    self.scores.pop(event[1], None)
+            elif kind == FOOD_ADD:
+                self.foods.add(event[1])
+            elif kind == FOOD_REMOVE:
+                self.foods.discard(event[1])
+            elif kind == SCORE:
+                self.scores[event[1]] = event[2]
+
+    def total_length(self):
+        return sum(len(body) for body in self.bodies.values())
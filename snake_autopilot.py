@@ -0,0 +1,262 @@
+import argparse
+import heapq
+import random
+import time
+from collections import deque
+
+from snake_engine import SnakeEngine, CELL_NUMBER_X, CELL_NUMBER_Y, DIRECTIONS
+from snake_profile import percentile
+
+# Autopilot for attract-mode demos and soak tests. Each tick it picks the
+# engine's next direction:
+#
+#   1. a shortest path to the food, taken only if the snake could still reach
+#      its own tail after eating (so it never walls itself in)
+#   2. otherwise chase the tail, taking the move with the longest way back to
+#      it, which buys time for the body to clear
+#   3. otherwise the next cell of a Hamiltonian cycle, or any free cell
+#
+# Tail chasing can go round in circles forever on a crowded board, so after
+# a board's worth of ticks without eating the food path is taken even if it
+# is not safe: a demo or soak test would rather lose than stall.
+#
+# Searches are A* and time-aware: a body cell counts as free from the tick the
+# tail will have left it, which matters on crowded boards. A path to the food
+# stays valid until the food is eaten (the snake only moves along it, and the
+# body only frees cells), so it is planned once per food and then replayed a
+# cell per tick. Planning time is measured on every tick.
+#
+# Tail chasing is not cached: while the autopilot is chasing its tail it
+# searches again every tick, the food path and then a way back to the tail
+# from each free neighbour, so those ticks cost several A* searches. A plan
+# to reach the tail does not stay safe as it is followed (the head can cut
+# off the trail the tail leaves), and replaying one, even re-checked every
+# tick, lost about a sixth of the score in soak tests without lowering the
+# worst tick. On the default board the worst tick is a few tens of ms.
+#
+# Nothing is precomputed per cell, so setting up and planning cost depend on
+# the snake's length and the distances searched, not on the board size.
+
+TIMING_WINDOW = 1000  # ticks kept for the planning time percentiles
+
+
+def hamiltonian_cycle(width, height):
+    # Row 0 left to right, rows 1.. zig-zag over columns 1.., then back up
+    # column 0. Needs an even height; returns None otherwise.
+    if height % 2 or width < 2:
+        return None
+    cycle = [(x, 0) for x in range(width)]
+    for y in range(1, height):
+        xs = range(width - 1, 0, -1) if y % 2 else range(1, width)
+        cycle.extend((x, y) for x in xs)
+    cycle.extend((0, y) for y in range(height - 1, 0, -1))
+    return cycle
+
+
+class Autopilot:
+    def __init__(self, engine):
+        self.engine = engine
+        self.width = engine.width
+        self.height = engine.height
+        self.size = engine.width * engine.height
+
+        # Remaining cells of the current path to `path_food`
+        self.path = deque()
+        self.path_food = None
+        self.mode = None
+        self.hungry = 0
+        self.last_score = engine.score
+        self.plans = 0
+        self.reuses = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.times = deque(maxlen=TIMING_WINDOW)
+
+    def next_direction(self):
+        start = time.perf_counter()
+        direction = self.choose()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.last_ms = elapsed
+        self.max_ms = max(self.max_ms, elapsed)
+        self.times.append(elapsed)
+        return direction
+
+    def neighbours(self, cell):
+        # [(neighbour, direction)] for the cells next to `cell`
+        width = self.width
+        y, x = divmod(cell, width)
+        return [(cell + dy * width + dx, (dx, dy)) for dx, dy in DIRECTIONS
+                if 0 <= x + dx < width and 0 <= y + dy < self.height]
+
+    def cycle_next(self, cell):
+        # The cell after `cell` on hamiltonian_cycle(), or None without one
+        width, height = self.width, self.height
+        if height % 2 or width < 2:
+            return None
+        y, x = divmod(cell, width)
+        if y == 0:
+            return cell + 1 if x < width - 1 else cell + width
+        if x == 0:
+            return cell - width
+        if y % 2:
+            if x > 1:
+                return cell - 1
+            return cell - 1 if y == height - 1 else cell + width
+        return cell + 1 if x < width - 1 else cell + width
+
+    def direction_to(self, head, cell):
+        for neighbour, direction in self.neighbours(head):
+            if neighbour == cell:
+                return direction
+        return None
+
+    def choose(self):
+        engine = self.engine
+        head = engine.body[0]
+        if engine.score != self.last_score:
+            self.last_score = engine.score
+            self.hungry = 0
+        self.hungry += 1
+        if self.path and self.path_food == engine.food:
+            direction = self.direction_to(head, self.path[0])
+            if direction is not None:
+                self.path.popleft()
+                self.reuses += 1
+                return direction
+
+        self.plans += 1
+        self.path.clear()
+        body = list(engine.body)
+        grow = 1 if engine.new_block else 0
+        free_at = self.free_times(body, grow)
+
+        if engine.food is not None:
+            path = self.search(head, engine.food, free_at)
+            if path and (self.hungry > self.size or self.safe_after(path, body, grow)):
+                self.mode = "food"
+                self.path.extend(path[1:])
+                self.path_food = engine.food
+                return self.direction_to(head, path[0])
+
+        cell = self.chase_tail(body, grow, free_at)
+        if cell is not None:
+            self.mode = "tail"
+            return self.direction_to(head, cell)
+
+        cycle_next = self.cycle_next(head)
+        if cycle_next is not None and free_at.get(cycle_next, 0) <= 1:
+            self.mode = "cycle"
+            return self.direction_to(head, cycle_next)
+
+        self.mode = "stuck"
+        for neighbour, direction in self.neighbours(head):
+            if free_at.get(neighbour, 0) <= 1:
+                return direction
+        return engine.direction
+
+    def free_times(self, body, grow):
+        # Tick at which each body cell is free to enter, once the tail has
+        # moved off it; cells not in the dict are free now
+        free_at = {cell: ticks for ticks, cell in enumerate(reversed(body), 1 + grow)}
+        free_at[body[0]] = self.size
+        return free_at
+
+    def search(self, start, target, free_at):
+        # A* shortest path from start to target, entering a cell only once it
+        # is free. Returns the cells after start, or None.
+        width = self.width
+        target_y, target_x = divmod(target, width)
+
+        def estimate(cell):
+            y, x = divmod(cell, width)
+            return abs(x - target_x) + abs(y - target_y)
+
+        parent = {start: None}
+        depth = {start: 0}
+        # (estimated length, -depth, cell): ties go to the node nearest the target
+        heap = [(estimate(start), 0, start)]
+        while heap:
+            _, negative_depth, cell = heapq.heappop(heap)
+            if cell == target:
+                path = []
+                while cell != start:
+                    path.append(cell)
+                    cell = parent[cell]
+                path.reverse()
+                return path
+            steps = 1 - negative_depth
+            if steps - 1 > depth[cell]:
+                continue
+            for neighbour, direction in self.neighbours(cell):
+                if free_at.get(neighbour, 0) > steps or depth.get(neighbour, steps + 1) <= steps:
+                    continue
+                depth[neighbour] = steps
+                parent[neighbour] = cell
+                heapq.heappush(heap, (steps + estimate(neighbour), -steps, neighbour))
+        return None
+
+    def safe_after(self, path, body, grow):
+        # True if, after following `path` and eating at its end, the head
+        # could still reach the tail
+        length = len(body) + grow
+        if length + 1 >= self.size:
+            return True
+        virtual = (path[::-1] + body)[:length]
+        return self.search(virtual[0], virtual[-1], self.free_times(virtual, 1)) is not None
+
+    def chase_tail(self, body, grow, free_at):
+        # The move whose way back to the tail is longest, or None
+        food = self.engine.food
+        best, best_length = None, -1
+        for neighbour, direction in self.neighbours(body[0]):
+            if free_at.get(neighbour, 0) > 1:
+                continue
+            eats = 1 if neighbour == food else 0
+            virtual = [neighbour] + (body if grow else body[:-1])
+            if len(virtual) < 2:
+                continue
+            path = self.search(neighbour, virtual[-1], self.free_times(virtual, eats))
+            if path is not None and len(path) > best_length:
+                best, best_length = neighbour, len(path)
+        return best
+
+    def summary(self):
+        times = sorted(self.times)
+        return (f"{self.plans} plans, {self.reuses} reused paths; planning "
+                f"p50 {percentile(times, 0.50):.3f} ms, p99 {percentile(times, 0.99):.3f} ms, "
+                f"max {self.max_ms:.3f} ms")
+
+
+def play(seed, width=CELL_NUMBER_X, height=CELL_NUMBER_Y, max_ticks=None):
+    # One headless autopilot game; returns (engine, autopilot, ticks)
+    engine = SnakeEngine(width, height, rng=random.Random(seed))
+    autopilot = Autopilot(engine)
+    ticks = 0
+    while not engine.done and (max_ticks is None or ticks < max_ticks):
+        engine.step(autopilot.next_direction())
+        ticks += 1
+    return engine, autopilot, ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the snake autopilot headless")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--width", type=int, default=CELL_NUMBER_X)
+    parser.add_argument("--height", type=int, default=CELL_NUMBER_Y)
+    parser.add_argument("--max-ticks", type=int, default=None)
+    args = parser.parse_args()
+
+    worst = 0.0
+    for game in range(args.games):
+        seed = args.seed + game
+        engine, autopilot, ticks = play(seed, args.width, args.height, args.max_ticks)
+        worst = max(worst, autopilot.max_ms)
+        result = "won" if engine.won else ("died" if engine.done else "stopped")
+        print(f"seed {seed}: {result}, score {engine.score}, length {len(engine.body)}, "
+              f"{ticks} ticks; {autopilot.summary()}")
+    print(f"worst planning time {worst:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
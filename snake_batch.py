@@ -0,0 +1,280 @@
+import numpy as np
+
+from snake_engine import (
+    SnakeEngine, CELL_NUMBER_X, CELL_NUMBER_Y, DIRECTIONS, START_DIRECTION,
+    START_SPEED, MIN_SPEED, SPEED_STEP, FOOD_SCORE, BODY, HEAD, FOOD, start_body,
+)
+
+# Vectorized version of SnakeEngine: N boards stepped together with NumPy.
+# The rules are the same as SnakeEngine.step (and so Game.update): move, eat,
+# then check collisions. Use check_parity() to compare the two.
+#
+# Observations are written into one buffer owned by the env, so stepping
+# allocates nothing: the array returned by reset(), step() and observe() is
+# overwritten by the next of those calls. Copy it to keep it longer (e.g. in
+# a replay buffer).
+
+# Actions are indexes into DIRECTIONS; a negative action keeps the direction
+DX = np.array([dx for dx, dy in DIRECTIONS], dtype=np.int32)
+DY = np.array([dy for dx, dy in DIRECTIONS], dtype=np.int32)
+
+REWARD_FOOD = 1.0
+REWARD_DEATH = -1.0
+
+
+class BatchSnakeEnv:
+    def __init__(self, num_envs, width=CELL_NUMBER_X, height=CELL_NUMBER_Y, seed=None):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.rng = np.random.default_rng(seed)
+        self.start_body = start_body(width, height)
+        self.start_direction = DIRECTIONS.index(START_DIRECTION)
+
+        n, size = num_envs, self.size
+        self.envs = np.arange(n)
+        # Bodies are ring buffers: the head sits at slot `head_slot` and the
+        # rest of the body trails behind it at decreasing slots
+        self.body = np.zeros((n, size), dtype=np.int32)
+        self.head_slot = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.head_x = np.zeros(n, dtype=np.int32)
+        self.head_y = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.occupied = np.zeros((n, size), dtype=np.uint8)
+        # Free-cell index, as in SnakeEngine: the first free_count entries of
+        # each row of `free` are the cells the snake does not cover
+        self.free = np.zeros((n, size), dtype=np.int32)
+        self.free_index = np.zeros((n, size), dtype=np.int32)
+        self.free_count = np.zeros(n, dtype=np.int32)
+        self.food = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.speed = np.zeros(n, dtype=np.int32)
+        self.new_block = np.zeros(n, dtype=bool)
+        self.won = np.zeros(n, dtype=bool)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        # Score, length and ticks of games that ended on the last step
+        self.final_score = np.zeros(n, dtype=np.int32)
+        self.final_length = np.zeros(n, dtype=np.int32)
+        self.final_ticks = np.zeros(n, dtype=np.int64)
+        self.obs = np.zeros((n, size), dtype=np.uint8)
+        self.reset()
+
+    @property
+    def head(self):
+        return self.body[self.envs, self.head_slot]
+
+    def reset(self, envs=None):
+        if envs is None:
+            envs = self.envs
+        if len(envs) == 0:
+            return self.observe()
+
+        size = self.size
+        self.occupied[envs] = 0
+        self.free[envs] = np.arange(size, dtype=np.int32)
+        self.free_index[envs] = np.arange(size, dtype=np.int32)
+        self.free_count[envs] = size
+
+        # Start body is stored tail first so the head lands in the last slot
+        for slot, (x, y) in enumerate(reversed(self.start_body)):
+            cells = np.full(len(envs), y * self.width + x, dtype=np.int32)
+            self.body[envs, slot] = cells
+            self._take(envs, cells)
+            self.occupied[envs, cells] += 1
+        head_x, head_y = self.start_body[0]
+        self.head_slot[envs] = len(self.start_body) - 1
+        self.length[envs] = len(self.start_body)
+        self.head_x[envs] = head_x
+        self.head_y[envs] = head_y
+        self.direction[envs] = self.start_direction
+        self.score[envs] = 0
+        self.speed[envs] = START_SPEED
+        self.new_block[envs] = False
+        self.won[envs] = False
+        self.ticks[envs] = 0
+        self._place_food(envs)
+        return self.observe()
+
+    def _take(self, envs, cells):
+        index = self.free_index[envs, cells]
+        last = self.free_count[envs] - 1
+        moved = self.free[envs, last]
+        self.free[envs, index] = moved
+        self.free_index[envs, moved] = index
+        self.free[envs, last] = cells
+        self.free_index[envs, cells] = last
+        self.free_count[envs] = last
+
+    def _release(self, envs, cells):
+        index = self.free_index[envs, cells]
+        first = self.free_count[envs]
+        moved = self.free[envs, first]
+        self.free[envs, index] = moved
+        self.free_index[envs, moved] = index
+        self.free[envs, first] = cells
+        self.free_index[envs, cells] = first
+        self.free_count[envs] = first + 1
+
+    def _place_food(self, envs):
+        full = self.free_count[envs] == 0
+        self.won[envs[full]] = True
+        self.food[envs[full]] = -1
+
+        envs = envs[~full]
+        picks = (self.rng.random(len(envs)) * self.free_count[envs]).astype(np.int32)
+        self.food[envs] = self.free[envs, picks]
+
+    def step(self, actions):
+        # Returns (observations, rewards, dones). Finished boards are reset
+        # before returning, so their observation is the start of a new game;
+        # final_score/final_length/final_ticks hold the game that ended.
+        actions = np.asarray(actions)
+        self.direction = np.where(actions >= 0, actions, self.direction).astype(np.int8)
+        x = self.head_x + DX[self.direction]
+        y = self.head_y + DY[self.direction]
+        hit_wall = (x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)
+        moving = self.envs[~hit_wall]
+        self.ticks += 1
+
+        # Drop the tail unless the snake is growing this tick
+        growing = self.new_block[moving]
+        self.new_block[moving] = False
+        shrink = moving[~growing]
+        tail_slot = (self.head_slot[shrink] - self.length[shrink] + 1) % self.size
+        tails = self.body[shrink, tail_slot]
+        self.occupied[shrink, tails] -= 1
+        self.length[shrink] -= 1
+        vacated = self.occupied[shrink, tails] == 0
+        self._release(shrink[vacated], tails[vacated])
+
+        # Advance the head
+        cells = y[moving] * self.width + x[moving]
+        self.head_slot[moving] = (self.head_slot[moving] + 1) % self.size
+        self.body[moving, self.head_slot[moving]] = cells
+        self.length[moving] += 1
+        entered = self.occupied[moving, cells] == 0
+        self._take(moving[entered], cells[entered])
+        self.occupied[moving, cells] += 1
+        self.head_x[moving] = x[moving]
+        self.head_y[moving] = y[moving]
+
+        # Eat
+        ate = moving[self.food[moving] == cells]
+        self.new_block[ate] = True
+        self.score[ate] += FOOD_SCORE
+        self.speed[ate] -= np.where(self.speed[ate] > MIN_SPEED, SPEED_STEP, 0).astype(np.int32)
+        self._place_food(ate)
+
+        # Collisions
+        collided = hit_wall | (self.occupied[self.envs, self.head] > 1)
+        dones = collided | self.won
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        rewards[ate] = REWARD_FOOD
+        rewards[collided] = REWARD_DEATH
+
+        finished = self.envs[dones]
+        self.final_score[finished] = self.score[finished]
+        self.final_length[finished] = self.length[finished]
+        self.final_ticks[finished] = self.ticks[finished]
+        return self.reset(finished), rewards, dones
+
+    def observe(self):
+        # Grids of snake_engine cell codes, shape (num_envs, height, width).
+        # A view of self.obs: only valid until the next reset/step/observe.
+        obs = self.obs
+        np.multiply(self.occupied > 0, BODY, out=obs, casting="unsafe")
+        has_food = self.food >= 0
+        obs[self.envs[has_food], self.food[has_food]] = FOOD
+        obs[self.envs, self.head] = HEAD
+        return obs.reshape(self.num_envs, self.height, self.width)
+
+    def positions(self, env):
+        # Body of one board as (x, y) tuples, head first (for checks and tools)
+        slots = (self.head_slot[env] - np.arange(self.length[env])) % self.size
+        return [(int(cell) % self.width, int(cell) // self.width) for cell in self.body[env, slots]]
+
+
+def _parity_action(engine, rng):
+    # Head for the food along safe moves most of the time, so that bodies get
+    # long and small boards get filled; otherwise pick any move, deadly or not
+    if rng.random() < 0.05 or engine.food is None:
+        return int(rng.integers(-1, 4))
+
+    food_x, food_y = engine.food_xy
+    best, best_distance = int(rng.integers(0, 4)), None
+    for action, (dx, dy) in enumerate(DIRECTIONS):
+        x, y = engine.head_x + dx, engine.head_y + dy
+        if not 0 <= x < engine.width or not 0 <= y < engine.height:
+            continue
+        cell = engine.cell(x, y)
+        if engine.occupied[cell] and (cell != engine.body[-1] or engine.new_block):
+            continue
+        distance = abs(food_x - x) + abs(food_y - y) + rng.random()
+        if best_distance is None or distance < best_distance:
+            best, best_distance = action, distance
+    return best
+
+
+def check_parity(num_envs=64, ticks=5000, width=CELL_NUMBER_X, height=CELL_NUMBER_Y, seed=0):
+    # Step a BatchSnakeEnv and one SnakeEngine per board with the same actions
+    # and compare the full state after every tick. Food positions are copied
+    # from the batch boards (after checking they are free cells in the scalar
+    # engine), since the two use different random generators.
+    batch = BatchSnakeEnv(num_envs, width, height, seed=seed)
+    engines = [SnakeEngine(width, height) for _ in range(num_envs)]
+    for i, engine in enumerate(engines):
+        engine.food = int(batch.food[i])
+
+    rng = np.random.default_rng(seed + 1)
+    games = wins = 0
+    for tick in range(ticks):
+        actions = np.array([_parity_action(engine, rng) for engine in engines])
+        _, rewards, dones = batch.step(actions)
+
+        for i, engine in enumerate(engines):
+            action = int(actions[i])
+            ate, done = engine.step(DIRECTIONS[action] if action >= 0 else None)
+            state = (ate, done, engine.score, len(engine.body))
+            expected = (bool(rewards[i] == REWARD_FOOD), bool(dones[i]))
+            if done:
+                expected += (int(batch.final_score[i]), int(batch.final_length[i]))
+            else:
+                expected += (int(batch.score[i]), int(batch.length[i]))
+            if state != expected:
+                raise AssertionError(f"tick {tick} env {i}: engine {state} != batch {expected}")
+
+            if done:
+                games += 1
+                wins += engine.won
+                engine.reset()
+            elif engine.positions() != batch.positions(i) or engine.speed != batch.speed[i]:
+                raise AssertionError(f"tick {tick} env {i}: bodies differ")
+            elif engine.free_count != batch.free_count[i]:
+                raise AssertionError(f"tick {tick} env {i}: free cells differ")
+
+            if engine.food != batch.food[i]:
+                food = int(batch.food[i])
+                if food < 0 or engine.occupied[food]:
+                    raise AssertionError(f"tick {tick} env {i}: food on the snake")
+                engine.food = food
+    return games, wins
+
+
+if __name__ == "__main__":
+    import time
+
+    for width, height in ((CELL_NUMBER_X, CELL_NUMBER_Y), (6, 4)):
+        games, wins = check_parity(width=width, height=height)
+        print(f"parity ok on {width}x{height} over {games} games ({wins} won)")
+
+    env = BatchSnakeEnv(4096, seed=0)
+    rng = np.random.default_rng(0)
+    steps = 200
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.step(np.where(rng.random(env.num_envs) < 0.9, -1, rng.integers(0, 4, env.num_envs)))
+    elapsed = time.perf_counter() - start
+    print(f"{env.num_envs * steps / elapsed:,.0f} env steps/sec with {env.num_envs} boards")
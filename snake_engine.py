@@ -0,0 +1,212 @@
+import random
+from collections import deque
+
+# Headless simulation core for the snake game. Nothing in here imports pygame,
+# so bots, tests and tooling can step games on machines without SDL.
+
+# Board size in cells (matches the playfield drawn by snake_game)
+CELL_NUMBER_X = 36
+CELL_NUMBER_Y = 24
+
+# Directions as (dx, dy) cell offsets
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (UP, RIGHT, DOWN, LEFT)
+
+# Rules
+START_BODY = ((5, 10), (4, 10), (3, 10))
+START_DIRECTION = RIGHT
+START_SPEED = 150
+MIN_SPEED = 80
+SPEED_STEP = 2
+FOOD_SCORE = 10
+
+# Observation cell codes
+EMPTY = 0
+BODY = 1
+HEAD = 2
+FOOD = 3
+
+
+def is_reverse(direction, other):
+    return direction[0] == -other[0] and direction[1] == -other[1]
+
+
+def start_body(width, height):
+    # The classic start position, pulled in to fit small boards
+    head_x, head_y = START_BODY[0]
+    head_x = min(head_x, width - 1)
+    head_y = min(head_y, height // 2)
+    return [(head_x - i, head_y) for i in range(len(START_BODY))]
+
+
+class SnakeEngine:
+    # The body is a deque of integer cells (y * width + x), head first. An
+    # occupancy count per cell is kept alongside it so that moving, growing
+    # and self-collision checks cost O(1) whatever the snake's length.
+    #
+    # Free cells are indexed too: `free` is a permutation of all cells whose
+    # first `free_count` entries are the cells not covered by the snake, and
+    # `free_index` maps each cell to its slot. Taking or releasing a cell is a
+    # swap, and food is drawn from the free prefix in O(1).
+
+    def __init__(self, width=CELL_NUMBER_X, height=CELL_NUMBER_Y, rng=None):
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else random.Random()
+        self.reset()
+
+    def reset(self):
+        self.reset_snake()
+        self.place_food()
+        self.score = 0
+        self.speed = START_SPEED
+
+    def reset_snake(self):
+        self.set_body(start_body(self.width, self.height), START_DIRECTION)
+
+    def set_body(self, positions, direction):
+        # Place the snake on the board: positions are (x, y), head first
+        size = self.width * self.height
+        self.occupied = bytearray(size)
+        self.free = list(range(size))
+        self.free_index = list(range(size))
+        self.free_count = size
+        self.body = deque()
+        for x, y in positions:
+            cell = y * self.width + x
+            self.body.append(cell)
+            if not self.occupied[cell]:
+                self.take_cell(cell)
+            self.occupied[cell] += 1
+        self.head_x, self.head_y = positions[0]
+        self.direction = direction
+        self.new_block = False
+        self.hit_wall = False
+        self.previous_tail = None
+        self.won = False
+        self.done = False
+
+    def cell(self, x, y):
+        return y * self.width + x
+
+    def xy(self, cell):
+        y, x = divmod(cell, self.width)
+        return x, y
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    @property
+    def food_xy(self):
+        return None if self.food is None else self.xy(self.food)
+
+    def positions(self):
+        # Body as (x, y) tuples, head first
+        width = self.width
+        return [(cell % width, cell // width) for cell in self.body]
+
+    def take_cell(self, cell):
+        # Swap `cell` out of the free prefix
+        index = self.free_index[cell]
+        last = self.free_count - 1
+        moved = self.free[last]
+        self.free[index] = moved
+        self.free_index[moved] = index
+        self.free[last] = cell
+        self.free_index[cell] = last
+        self.free_count = last
+
+    def release_cell(self, cell):
+        # Swap `cell` back into the free prefix
+        index = self.free_index[cell]
+        first = self.free_count
+        moved = self.free[first]
+        self.free[index] = moved
+        self.free_index[moved] = index
+        self.free[first] = cell
+        self.free_index[cell] = first
+        self.free_count = first + 1
+
+    def place_food(self):
+        # Food only ever lands on a free cell; a full board means the game is won
+        if self.free_count == 0:
+            self.food = None
+            self.won = True
+            self.done = True
+            return
+        self.food = self.free[self.rng.randrange(self.free_count)]
+
+    def move(self):
+        x = self.head_x + self.direction[0]
+        y = self.head_y + self.direction[1]
+        if not 0 <= x < self.width or not 0 <= y < self.height:
+            # The head stays on the last cell it reached; collided() reports it
+            self.hit_wall = True
+            self.previous_tail = None
+            return
+
+        # previous_tail is where the last segment was before this move, so
+        # renderers can interpolate between ticks (None: nothing moved)
+        occupied = self.occupied
+        if self.new_block:
+            self.new_block = False
+            self.previous_tail = self.body[-1]
+        else:
+            tail = self.previous_tail = self.body.pop()
+            occupied[tail] -= 1
+            if not occupied[tail]:
+                self.release_cell(tail)
+
+        cell = y * self.width + x
+        self.body.appendleft(cell)
+        if not occupied[cell]:
+            self.take_cell(cell)
+        occupied[cell] += 1
+        self.head_x = x
+        self.head_y = y
+
+    def eat(self):
+        if self.hit_wall or self.food != self.body[0]:
+            return False
+
+        self.place_food()
+        self.new_block = True
+        self.score += FOOD_SCORE
+
+        # Increase speed slightly
+        if self.speed > MIN_SPEED:
+            self.speed -= SPEED_STEP
+        return True
+
+    def collided(self):
+        # Wall hit, or the head moved onto a cell the body still occupies
+        return self.hit_wall or self.occupied[self.body[0]] > 1
+
+    def step(self, direction=None):
+        # One game tick: returns (ate, done)
+        if direction is not None:
+            self.direction = direction
+        self.move()
+        ate = self.eat()
+        if self.collided():
+            self.done = True
+        return ate, self.done
+
+    def observe(self, out=None):
+        # Row-major grid of cell codes, written into `out` if given
+        size = self.width * self.height
+        if out is None:
+            out = bytearray(size)
+        else:
+            out[:size] = bytes(size)
+
+        for cell in self.body:
+            out[cell] = BODY
+        if self.food is not None:
+            out[self.food] = FOOD
+        out[self.body[0]] = HEAD
+        return out
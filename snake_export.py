@@ -0,0 +1,245 @@
+import argparse
+import logging
+import math
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Frame export for highlight clips and visual regression tests. Frames drawn
+# by Game.draw_elements are streamed to disk as a PNG sequence or as raw RGB
+# (one frame after another, for piping into e.g. ffmpeg).
+#
+# The game thread only copies each frame out of the surface: it reads the
+# pixels through a buffer view, with no per-pixel access, and copies them in
+# one block into a preallocated buffer from a small pool. Converting to RGB
+# and writing happen on an encoder thread. While the pool is empty a live
+# game drops the frame instead of waiting; an offline export waits.
+#
+# Run on its own, this module renders autopilot games or replays with SDL's
+# dummy video driver, on a virtual clock, so export runs as fast as frames
+# can be drawn and encoded.
+
+log = logging.getLogger("snake_export")
+
+POOL_SIZE = 8  # frames that can wait for the encoder
+EXPORT_FPS = 60
+GAME_OVER_SECONDS = 2.0  # of the game over screen kept at the end of a clip
+
+
+class FrameExporter:
+    def __init__(self, png_dir=None, raw_path=None, pool_size=POOL_SIZE, block=False):
+        if (png_dir is None) == (raw_path is None):
+            raise ValueError("export to either a PNG directory or a raw RGB file")
+        self.png_dir = png_dir
+        self.raw_path = raw_path
+        self.pool_size = pool_size
+        self.block = block
+        self.size = None
+        self.channels = None
+        self.raw_file = None
+        self.frames = 0
+        self.dropped = 0
+        self.capture_time = 0.0
+        self.error = None
+        if png_dir is not None:
+            os.makedirs(png_dir, exist_ok=True)
+        elif raw_path == "-":
+            self.raw_file = sys.stdout.buffer
+        else:
+            self.raw_file = open(raw_path, "wb")
+
+        # Buffers move from `free` to `pending` and back; None on `pending`
+        # stops the encoder
+        self.free = queue.Queue()
+        self.pending = queue.Queue()
+        self.encoder = threading.Thread(target=self.encode_loop, name="frame-encoder", daemon=True)
+        self.encoder.start()
+
+    def setup(self, surface):
+        # Sized from the first frame: a pool of buffers holding the surface's
+        # rows as they are in memory, pitch and all
+        width, height = surface.get_size()
+        if surface.get_bytesize() != 4:
+            raise ValueError("frame export needs a 32-bit surface")
+        self.size = (width, height)
+        # Byte offset of red, green and blue within a pixel
+        red, green, blue = surface.get_shifts()[:3]
+        if sys.byteorder == "big":
+            self.channels = [3 - red // 8, 3 - green // 8, 3 - blue // 8]
+        else:
+            self.channels = [red // 8, green // 8, blue // 8]
+        for _ in range(self.pool_size):
+            self.free.put(np.empty((height, surface.get_pitch()), dtype=np.uint8))
+
+    def capture(self, surface):
+        # Called once per drawn frame on the game thread
+        if self.error is not None:
+            raise self.error
+        if self.size is None:
+            self.setup(surface)
+        elif surface.get_size() != self.size:
+            raise ValueError(f"frame size changed from {self.size} to {surface.get_size()}")
+        try:
+            buffer = self.free.get(block=self.block)
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        start = time.perf_counter()
+        # The view locks the surface until it is released at the end of the
+        # copy, so it must not outlive this statement
+        np.copyto(buffer, np.frombuffer(surface.get_view("0"), dtype=np.uint8).reshape(buffer.shape))
+        self.pending.put((self.frames, buffer))
+        self.frames += 1
+        self.capture_time += time.perf_counter() - start
+        return True
+
+    def encode_loop(self):
+        import pygame
+
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            index, buffer = item
+            try:
+                if self.error is None:
+                    width, height = self.size
+                    pixels = buffer[:, :width * 4].reshape(height, width, 4)
+                    rgb = np.ascontiguousarray(pixels[:, :, self.channels])
+                    if self.raw_file is not None:
+                        self.raw_file.write(rgb.data)
+                    else:
+                        frame = pygame.image.frombuffer(rgb, (width, height), "RGB")
+                        pygame.image.save(frame, os.path.join(self.png_dir, f"frame{index:06d}.png"))
+            except (OSError, pygame.error) as exc:
+                # Reported to the game thread on its next capture or close
+                self.error = exc
+            finally:
+                self.free.put(buffer)
+
+    def close(self):
+        # Waits for every captured frame to be written
+        self.pending.put(None)
+        self.encoder.join()
+        if self.raw_file is not None and self.raw_file is not sys.stdout.buffer:
+            self.raw_file.close()
+        elif self.raw_file is not None:
+            self.raw_file.flush()
+        if self.dropped:
+            log.warning("dropped %d of %d frames while the encoder was busy",
+                        self.dropped, self.frames + self.dropped)
+        if self.error is not None:
+            raise self.error
+
+    def summary(self):
+        per_frame = self.capture_time / self.frames * 1000 if self.frames else 0.0
+        return f"{self.frames} frames, {self.dropped} dropped, {per_frame:.2f} ms per frame copy on the game thread"
+
+
+def export_game(game, screen, exporter, fps=EXPORT_FPS, max_frames=None, speed_up=1.0,
+                game_over_seconds=GAME_OVER_SECONDS):
+    # Renders the game already started on `game` until it ends, plus some of
+    # the game over screen, at `fps` frames per second of game time. Time
+    # comes from a virtual clock, so this runs as fast as it can.
+    from snake_game import BACKGROUND, PLAYING, GAME_OVER
+    from snake_loop import FixedTimestep
+
+    now = [0.0]
+    frame_interval = 1 / fps
+    timestep = FixedTimestep(clock=lambda: now[0], frame_interval=frame_interval)
+    game_over_frames = int(game_over_seconds * fps)
+    frames = 0
+    while max_frames is None or frames < max_frames:
+        timestep.begin_frame(game.state == PLAYING)
+        while game.state == PLAYING and timestep.tick_due(game.speed / 1000 / speed_up):
+            game.update()
+        if game.state == GAME_OVER:
+            if game_over_frames <= 0:
+                break
+            game_over_frames -= 1
+        screen.fill(BACKGROUND)
+        game.draw_elements(screen, timestep.alpha(game.speed / 1000 / speed_up))
+        exporter.capture(screen)
+        frames += 1
+        now[0] += frame_interval
+    return frames
+
+
+def frame_rate(text):
+    # Frames per second, for --fps
+    try:
+        fps = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number of frames per second, got {text!r}")
+    if fps < 1:
+        raise argparse.ArgumentTypeError("the frame rate must be at least 1")
+    return fps
+
+
+def replay_speed(text):
+    # Speed multiplier, for --replay-speed
+    try:
+        speed = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, got {text!r}")
+    if not 0 < speed < math.inf:
+        raise argparse.ArgumentTypeError("the replay speed must be a positive number")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render snake games to PNG frames or raw RGB video headless")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", metavar="FILE", help="render a recorded replay")
+    source.add_argument("--autopilot", action="store_true", help="render an autopilot game")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--png", metavar="DIR", help="write frame000000.png, frame000001.png, ... into DIR")
+    output.add_argument("--raw", metavar="PATH", help="write raw RGB frames to PATH ('-' for stdout)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --autopilot")
+    parser.add_argument("--fps", type=frame_rate, default=EXPORT_FPS)
+    parser.add_argument("--replay-speed", type=replay_speed, default=1.0,
+                        help="speed multiplier for --replay")
+    parser.add_argument("--max-frames", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s", stream=sys.stderr)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    # pygame's import banner would end up in raw video on stdout
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    from snake_game import Game, WINDOW_WIDTH, WINDOW_HEIGHT, init_pygame
+    from snake_replay import Replay
+    from snake_scores import ScoreStore
+
+    init_pygame()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    replay = Replay.load(args.replay) if args.replay else None
+    board = (replay.width, replay.height) if replay else ()
+    # Nothing is recorded while exporting
+    game = Game(ScoreStore(":memory:"), *board)
+    if replay:
+        game.start_replay(replay)
+    else:
+        game.reset_game(args.seed, autopilot=True)
+
+    exporter = FrameExporter(args.png, args.raw, block=True)
+    start = time.perf_counter()
+    frames = export_game(game, screen, exporter, args.fps, args.max_frames,
+                         args.replay_speed if replay else 1.0)
+    exporter.close()
+    elapsed = time.perf_counter() - start
+    game.scores.close()
+    log.info("%s; %.1f frames/sec, %.1fx real time", exporter.summary(), frames / elapsed,
+             frames / args.fps / elapsed)
+    if args.raw:
+        log.info("encode with: ffmpeg -f rawvideo -pix_fmt rgb24 -s %dx%d -r %d -i %s clip.mp4",
+                 WINDOW_WIDTH, WINDOW_HEIGHT, args.fps, args.raw)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,33 @@
+import time
+
+# Taken before pygame is imported, for --startup-time
+IMPORT_STARTED = time.perf_counter()
+
 import pygame
 import random
 import sys
-import json
 import os
 import math
+import argparse
+import logging
+
+from snake_engine import SnakeEngine, CELL_NUMBER_X, CELL_NUMBER_Y, UP, DOWN, LEFT, RIGHT
+from snake_loop import FixedTimestep
+from snake_particles import ParticleSystem
+from snake_replay import Replay, ReplayRecorder, ReplayPlayer
+from snake_scores import ScoreStore
+from snake_profile import FrameProfiler
+from snake_autopilot import Autopilot
+from snake_input import InputQueue
+from snake_export import FrameExporter
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+log = logging.getLogger("snake_game")
 
 # Constants
 WINDOW_WIDTH = 900
 WINDOW_HEIGHT = 700
-CELL_SIZE = 25
-CELL_NUMBER_X = WINDOW_WIDTH // CELL_SIZE
-CELL_NUMBER_Y = (WINDOW_HEIGHT - 100) // CELL_SIZE  # Reserve space for UI
+CELL_SIZE = 25  # Default: WINDOW_WIDTH // CELL_SIZE == CELL_NUMBER_X
+UI_HEIGHT = 100  # Reserved at the top of the window; the board is drawn below
 
 # Modern 2025 Color Palette
 BACKGROUND = (15, 15, 25)
@@ -38,174 +51,277 @@ PLAYING = 1
 GAME_OVER = 2
 PAUSED = 3
 
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.vx = random.uniform(-3, 3)
-        self.vy = random.uniform(-3, 3)
-        self.life = 60
-        self.max_life = 60
-        self.color = color
-        self.size = random.uniform(2, 5)
-    
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.life -= 1
-        self.vx *= 0.98
-        self.vy *= 0.98
-    
-    def draw(self, screen):
-        alpha = int(255 * (self.life / self.max_life))
-        size = int(self.size * (self.life / self.max_life))
-        if size > 0:
-            color_with_alpha = (*self.color, alpha)
-            surf = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-            pygame.draw.circle(surf, color_with_alpha, (size, size), size)
-            screen.blit(surf, (self.x - size, self.y - size))
+PARTICLE_LIFE = 60
+PARTICLES_PER_FOOD = 15
+BODY_SHADES = 32
+AUTOPILOT_RESTART = 3.0  # seconds on the game over screen in --autopilot mode
+
+# Fonts are opened on first use and shared by size
+FONTS = {}
+
+
+def init_pygame():
+    # Only what the game uses: a window and text. No audio.
+    pygame.display.init()
+    pygame.font.init()
+
+
+def get_font(size):
+    font = FONTS.get(size)
+    if font is None:
+        font = FONTS[size] = pygame.font.Font(None, size)
+    return font
+
+
+class SpriteCache:
+    # Pre-rendered surfaces for the render loop, keyed by everything they
+    # depend on (size, colour, alpha, direction...). The snake and food are
+    # built up front; glows and particle discs on first use, since there are
+    # over a thousand of them and most never appear before the first meal.
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.surfaces = {}
+        # Head sprites overhang the cell by this much for the glow
+        self.head_margin = self.scale(5)
+
+        self.heads = {direction: self.prepare(self.build_head(direction)) for direction in (UP, DOWN, LEFT, RIGHT)}
+        # Body colour lookup table from SNAKE_BODY_START to SNAKE_BODY_END
+        self.body_shades = [self.prepare(self.build_body(shade / (BODY_SHADES - 1))) for shade in range(BODY_SHADES)]
+        self.food = self.prepare(self.build_food())
+
+    def scale(self, pixels):
+        # Sprite details are designed for 25 px cells and scaled to fit
+        return max(1, round(pixels * self.cell_size / CELL_SIZE))
+
+    def prepare(self, surface):
+        # Match the display's pixel format once there is a display
+        if pygame.display.get_surface() is not None:
+            return surface.convert_alpha()
+        return surface
+
+    def get(self, key, build, *args):
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = self.prepare(build(*args))
+        return surface
+
+    def disc(self, color, radius, alpha):
+        return self.get(("disc", color, radius, alpha), self.build_disc, color, radius, alpha)
+
+    def square(self, color, alpha):
+        return self.get(("square", color, alpha), self.build_square, color, alpha)
+
+    def food_glow(self, glow_size):
+        return self.get(("food_glow", glow_size), self.build_food_glow, glow_size)
+
+    def build_disc(self, color, radius, alpha):
+        surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (*color, alpha), (radius, radius), radius)
+        return surf
+
+    def build_square(self, color, alpha):
+        surf = pygame.Surface((self.cell_size, self.cell_size), pygame.SRCALPHA)
+        surf.fill((*color, alpha))
+        return surf
+
+    def build_head(self, direction):
+        # Head with its glow; blit at (x - head_margin, y - head_margin)
+        cell = self.cell_size
+        margin = self.head_margin
+        scale = self.scale
+        surf = pygame.Surface((cell + 2 * margin, cell + 2 * margin), pygame.SRCALPHA)
+        pygame.draw.rect(surf, (*SNAKE_HEAD, 50), (0, 0, cell + 2 * margin, cell + 2 * margin), border_radius=scale(8))
+        pygame.draw.rect(surf, SNAKE_HEAD, (margin, margin, cell, cell), border_radius=scale(8))
+
+        # Modern eyes
+        eye_size = scale(4)
+        if direction == RIGHT:
+            eye1, eye2 = (15, 7), (15, 17)
+        elif direction == LEFT:
+            eye1, eye2 = (8, 7), (8, 17)
+        elif direction == UP:
+            eye1, eye2 = (7, 8), (17, 8)
+        else:  # Down
+            eye1, eye2 = (7, 15), (17, 15)
+        for eye_x, eye_y in (eye1, eye2):
+            center = (scale(eye_x) + margin, scale(eye_y) + margin)
+            pygame.draw.circle(surf, (255, 255, 255), center, eye_size)
+            pygame.draw.circle(surf, (0, 0, 0), center, max(1, eye_size - scale(2)))
+        return surf
+
+    def build_body(self, ratio):
+        # Gradient color based on position
+        r = int(SNAKE_BODY_START[0] * (1 - ratio) + SNAKE_BODY_END[0] * ratio)
+        g = int(SNAKE_BODY_START[1] * (1 - ratio) + SNAKE_BODY_END[1] * ratio)
+        b = int(SNAKE_BODY_START[2] * (1 - ratio) + SNAKE_BODY_END[2] * ratio)
+
+        cell = self.cell_size
+        surf = pygame.Surface((cell, cell), pygame.SRCALPHA)
+        pygame.draw.rect(surf, (r, g, b), (0, 0, cell, cell), border_radius=self.scale(6))
+        # Highlight effect
+        pygame.draw.rect(surf, (255, 255, 255), (0, 0, cell, self.scale(3)), border_radius=self.scale(3))
+        return surf
+
+    def build_food(self):
+        cell = self.cell_size
+        surf = pygame.Surface((cell, cell), pygame.SRCALPHA)
+        # Food with modern design
+        pygame.draw.circle(surf, FOOD_COLOR, (cell // 2, cell // 2), max(1, cell // 2 - self.scale(2)))
+        # Highlight
+        highlight = self.scale(3)
+        pygame.draw.circle(surf, (255, 255, 255), (cell // 2 - highlight, cell // 2 - highlight), highlight)
+        return surf
+
+    def build_food_glow(self, glow_size):
+        # Outer glow; blit at (x - glow_size, y - glow_size)
+        radius = self.cell_size // 2 + glow_size
+        surf = pygame.Surface((radius * 2 + self.cell_size % 2, radius * 2 + self.cell_size % 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (*FOOD_GLOW, 80), (radius, radius), radius)
+        return surf
 
 class Snake:
-    def __init__(self):
-        self.body = [pygame.Vector2(5, 10), pygame.Vector2(4, 10), pygame.Vector2(3, 10)]
-        self.direction = pygame.Vector2(1, 0)
-        self.new_block = False
+    def __init__(self, engine, sprites, camera):
+        self.engine = engine
+        self.sprites = sprites
+        self.camera = camera
+        # Recent head positions in board pixels
         self.trail = []
-        
-    def draw_snake(self, screen):
+
+    @property
+    def body(self):
+        return self.engine.positions()
+
+    @property
+    def direction(self):
+        return pygame.Vector2(self.engine.direction)
+
+    @direction.setter
+    def direction(self, value):
+        self.engine.direction = (int(value[0]), int(value[1]))
+
+    @property
+    def new_block(self):
+        return self.engine.new_block
+
+    def head_position(self, alpha):
+        # The head of interpolated_body(alpha), without the rest of the body
+        engine = self.engine
+        x, y = engine.xy(engine.body[0])
+        if alpha >= 1 or engine.previous_tail is None or len(engine.body) < 2:
+            return x, y
+        px, py = engine.xy(engine.body[1])
+        return px + (x - px) * alpha, py + (y - py) * alpha
+
+    def interpolated_body(self, alpha):
+        # Body positions `alpha` of the way from the previous tick to this one
+        body = self.body
+        previous_tail = self.engine.previous_tail
+        if alpha >= 1 or previous_tail is None:
+            return body
+        previous = body[1:]
+        previous.append(self.engine.xy(previous_tail))
+        return [(px + (x - px) * alpha, py + (y - py) * alpha)
+                for (x, y), (px, py) in zip(body, previous)]
+
+    def draw_snake(self, screen, alpha=1.0):
+        sprites = self.sprites
+        camera = self.camera
+        cell = camera.cell_size
+        offset_x, offset_y = camera.offset()
+
         # Draw trail effect
-        for i, pos in enumerate(self.trail):
-            alpha = int(50 * (1 - i / len(self.trail)))
-            if alpha > 0:
-                surf = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
-                color = (*SNAKE_BODY_END, alpha)
-                pygame.draw.rect(surf, color, (0, 0, CELL_SIZE, CELL_SIZE))
-                screen.blit(surf, (pos[0], pos[1]))
+        for i, (x, y) in enumerate(self.trail):
+            trail_alpha = int(50 * (1 - i / len(self.trail)))
+            if trail_alpha > 0:
+                screen.blit(sprites.square(SNAKE_BODY_END, trail_alpha), (x + offset_x, y + offset_y))
         
-        # Draw snake body with gradient
-        for index, block in enumerate(self.body):
-            x_pos = int(block.x * CELL_SIZE)
-            y_pos = int(block.y * CELL_SIZE) + 100  # Offset for UI
-            
-            if index == 0:  # Head
-                # Glow effect for head
-                glow_surf = pygame.Surface((CELL_SIZE + 10, CELL_SIZE + 10), pygame.SRCALPHA)
-                pygame.draw.rect(glow_surf, (*SNAKE_HEAD, 50), (0, 0, CELL_SIZE + 10, CELL_SIZE + 10), border_radius=8)
-                screen.blit(glow_surf, (x_pos - 5, y_pos - 5))
-                
-                # Head with rounded corners
-                pygame.draw.rect(screen, SNAKE_HEAD, (x_pos, y_pos, CELL_SIZE, CELL_SIZE), border_radius=8)
-                
-                # Modern eyes
-                eye_size = 4
-                if self.direction.x == 1:  # Right
-                    eye1 = (x_pos + 15, y_pos + 7)
-                    eye2 = (x_pos + 15, y_pos + 17)
-                elif self.direction.x == -1:  # Left
-                    eye1 = (x_pos + 8, y_pos + 7)
-                    eye2 = (x_pos + 8, y_pos + 17)
-                elif self.direction.y == -1:  # Up
-                    eye1 = (x_pos + 7, y_pos + 8)
-                    eye2 = (x_pos + 17, y_pos + 8)
-                else:  # Down
-                    eye1 = (x_pos + 7, y_pos + 15)
-                    eye2 = (x_pos + 17, y_pos + 15)
-                
-                pygame.draw.circle(screen, (255, 255, 255), eye1, eye_size)
-                pygame.draw.circle(screen, (255, 255, 255), eye2, eye_size)
-                pygame.draw.circle(screen, (0, 0, 0), eye1, eye_size - 2)
-                pygame.draw.circle(screen, (0, 0, 0), eye2, eye_size - 2)
-            else:  # Body
-                # Gradient color based on position
-                ratio = index / len(self.body)
-                r = int(SNAKE_BODY_START[0] * (1 - ratio) + SNAKE_BODY_END[0] * ratio)
-                g = int(SNAKE_BODY_START[1] * (1 - ratio) + SNAKE_BODY_END[1] * ratio)
-                b = int(SNAKE_BODY_START[2] * (1 - ratio) + SNAKE_BODY_END[2] * ratio)
-                body_color = (r, g, b)
-                
-                pygame.draw.rect(screen, body_color, (x_pos, y_pos, CELL_SIZE, CELL_SIZE), border_radius=6)
-                # Highlight effect
-                pygame.draw.rect(screen, (255, 255, 255, 30), (x_pos, y_pos, CELL_SIZE, 3), border_radius=3)
+        # Draw snake: head with glow, then the body with a gradient. Segments
+        # outside the viewport are skipped.
+        body = self.interpolated_body(alpha)
+        length = len(body)
+        head_x = round(body[0][0] * cell)
+        head_y = round(body[0][1] * cell)
+        margin = sprites.head_margin
+        screen.blit(sprites.heads[self.engine.direction], (head_x + offset_x - margin, head_y + offset_y - margin))
+
+        shades = sprites.body_shades
+        left, top, right, bottom = camera.visible_cells()
+        screen.blits([(shades[index * BODY_SHADES // length], (round(x * cell) + offset_x, round(y * cell) + offset_y))
+                      for index, (x, y) in enumerate(body)
+                      if index and left < x < right and top < y < bottom], False)
         
         # Update trail
-        if len(self.body) > 0:
-            head_pos = (int(self.body[0].x * CELL_SIZE), int(self.body[0].y * CELL_SIZE) + 100)
-            self.trail.append(head_pos)
-            if len(self.trail) > 8:
-                self.trail.pop(0)
+        self.trail.append((head_x, head_y))
+        if len(self.trail) > 8:
+            self.trail.pop(0)
             
     def move_snake(self):
-        if self.new_block:
-            body_copy = self.body[:]
-            body_copy.insert(0, body_copy[0] + self.direction)
-            self.body = body_copy[:]
-            self.new_block = False
-        else:
-            body_copy = self.body[:-1]
-            body_copy.insert(0, body_copy[0] + self.direction)
-            self.body = body_copy[:]
-            
+        self.engine.move()
+
     def add_block(self):
-        self.new_block = True
-        
+        self.engine.new_block = True
+
     def check_collision(self):
-        # Check wall collision
-        if not 0 <= self.body[0].x < CELL_NUMBER_X or not 0 <= self.body[0].y < CELL_NUMBER_Y:
-            return True
-            
-        # Check self collision
-        for block in self.body[1:]:
-            if block == self.body[0]:
-                return True
-                
-        return False
-    
+        return self.engine.collided()
+
     def reset(self):
-        self.body = [pygame.Vector2(5, 10), pygame.Vector2(4, 10), pygame.Vector2(3, 10)]
-        self.direction = pygame.Vector2(1, 0)
-        self.new_block = False
+        self.engine.reset_snake()
         self.trail = []
 
 class Food:
-    def __init__(self):
-        self.randomize()
+    def __init__(self, engine, sprites, camera):
+        self.engine = engine
+        self.sprites = sprites
+        self.camera = camera
         self.pulse = 0
+
+    @property
+    def pos(self):
+        # None once the snake fills the whole board
+        food_xy = self.engine.food_xy
+        return None if food_xy is None else pygame.Vector2(food_xy)
         
     def draw_food(self, screen):
-        x_pos = int(self.pos.x * CELL_SIZE)
-        y_pos = int(self.pos.y * CELL_SIZE) + 100
-        
+        if self.engine.food is None:
+            return
         # Pulsing glow effect
         self.pulse += 0.2
-        glow_size = int(5 + 3 * math.sin(self.pulse))
-        
-        # Outer glow
-        glow_surf = pygame.Surface((CELL_SIZE + glow_size * 2, CELL_SIZE + glow_size * 2), pygame.SRCALPHA)
-        pygame.draw.circle(glow_surf, (*FOOD_GLOW, 80), 
-                          (CELL_SIZE // 2 + glow_size, CELL_SIZE // 2 + glow_size), 
-                          CELL_SIZE // 2 + glow_size)
-        screen.blit(glow_surf, (x_pos - glow_size, y_pos - glow_size))
+        food_x, food_y = self.engine.food_xy
+        left, top, right, bottom = self.camera.visible_cells()
+        if not (left < food_x < right and top < food_y < bottom):
+            return
+        cell = self.camera.cell_size
+        offset_x, offset_y = self.camera.offset()
+        x_pos = food_x * cell + offset_x
+        y_pos = food_y * cell + offset_y
+        glow_size = int(5 + 3 * math.sin(self.pulse)) * cell // CELL_SIZE
         
-        # Food with modern design
-        pygame.draw.circle(screen, FOOD_COLOR, 
-                          (x_pos + CELL_SIZE // 2, y_pos + CELL_SIZE // 2), 
-                          CELL_SIZE // 2 - 2)
-        
-        # Highlight
-        pygame.draw.circle(screen, (255, 255, 255, 100), 
-                          (x_pos + CELL_SIZE // 2 - 3, y_pos + CELL_SIZE // 2 - 3), 
-                          3)
+        screen.blit(self.sprites.food_glow(glow_size), (x_pos - glow_size, y_pos - glow_size))
+        screen.blit(self.sprites.food, (x_pos, y_pos))
         
     def randomize(self):
-        self.x = random.randint(0, CELL_NUMBER_X - 1)
-        self.y = random.randint(0, CELL_NUMBER_Y - 1)
-        self.pos = pygame.Vector2(self.x, self.y)
+        self.engine.place_food()
+
+class TextCache:
+    # Remembers the last surface rendered into each slot, so text is only
+    # re-rendered when it actually changes
+    def __init__(self):
+        self.slots = {}
+
+    def render(self, slot, font, text, color):
+        cached = self.slots.get(slot)
+        if cached is None or cached[0] != text:
+            cached = self.slots[slot] = (text, font.render(text, True, color))
+        return cached[1]
 
 class Button:
-    def __init__(self, x, y, width, height, text, font):
+    def __init__(self, x, y, width, height, text, font_size):
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
-        self.font = font
+        self.font_size = font_size
+        # Rendered on first draw
+        self.text_surf = None
+        self.text_rect = None
         self.hovered = False
         self.clicked = False
         
@@ -219,164 +335,367 @@ class Button:
         return False
     
     def draw(self, screen):
+        if self.text_surf is None:
+            self.text_surf = get_font(self.font_size).render(self.text, True, TEXT_PRIMARY)
+            self.text_rect = self.text_surf.get_rect(center=self.rect.center)
         color = BUTTON_ACTIVE if self.clicked else (BUTTON_HOVER if self.hovered else BUTTON_COLOR)
         pygame.draw.rect(screen, color, self.rect, border_radius=10)
         pygame.draw.rect(screen, ACCENT_COLOR, self.rect, 2, border_radius=10)
-        
-        text_surf = self.font.render(self.text, True, TEXT_PRIMARY)
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        screen.blit(text_surf, text_rect)
+        screen.blit(self.text_surf, self.text_rect)
         
         self.clicked = False
 
+class Camera:
+    # Maps board cells to window pixels for the playfield below the UI bar.
+    # A board bigger than the viewport scrolls to keep the snake's head in
+    # the middle, stopping at the board's edges; a smaller one is centred.
+    # Drawing then only touches the cells in view, whatever the board size.
+    def __init__(self, board_width, board_height, cell_size, viewport):
+        self.board_width = board_width
+        self.board_height = board_height
+        self.cell_size = cell_size
+        self.viewport = pygame.Rect(viewport)
+        # Board pixel shown at the viewport's top left (negative when centred)
+        self.x = self.clamp(0, board_width * cell_size, self.viewport.width)
+        self.y = self.clamp(0, board_height * cell_size, self.viewport.height)
+
+    @staticmethod
+    def clamp(position, board_pixels, view_pixels):
+        if board_pixels <= view_pixels:
+            return -((view_pixels - board_pixels) // 2)
+        return max(0, min(board_pixels - view_pixels, round(position)))
+
+    def follow(self, cell_x, cell_y):
+        # Centre on a (possibly fractional) cell
+        cell = self.cell_size
+        self.x = self.clamp((cell_x + 0.5) * cell - self.viewport.width / 2,
+                            self.board_width * cell, self.viewport.width)
+        self.y = self.clamp((cell_y + 0.5) * cell - self.viewport.height / 2,
+                            self.board_height * cell, self.viewport.height)
+
+    def offset(self):
+        # Add to board pixels to get window pixels
+        return self.viewport.x - self.x, self.viewport.y - self.y
+
+    def visible_cells(self):
+        # Exclusive bounds, in cells, of what is at least partly in view
+        cell = self.cell_size
+        return (self.x / cell - 1, self.y / cell - 1,
+                (self.x + self.viewport.width) / cell, (self.y + self.viewport.height) / cell)
+
+    def board_rect(self):
+        # The part of the viewport the board covers, in window pixels
+        offset_x, offset_y = self.offset()
+        rect = pygame.Rect(offset_x, offset_y, self.board_width * self.cell_size,
+                           self.board_height * self.cell_size)
+        return rect.clip(self.viewport)
+
+class FrameBuffer(pygame.Surface):
+    # Off-screen frame that records every blit as (source, rect, area), so the
+    # dirty-rect renderer can tell which regions changed since the last frame.
+    # Sources are kept alive until the next frame, so they compare by identity.
+    def __init__(self, size, display):
+        super().__init__(size, 0, display)
+        self.drawn = set()
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = super().blit(source, dest, area, special_flags)
+        self.drawn.add((source, tuple(rect), None if area is None else tuple(area)))
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        rects = [self.blit(*item) for item in blit_sequence]
+        return rects if doreturn else None
+
+class DirtyRectRenderer:
+    # Pushes only the screen regions whose blits changed since the previous
+    # frame (head, vacated tail, food, trail, particles, changed HUD text)
+    # with pygame.display.update(rects), instead of flipping the whole window.
+    # Static layers are blitted every frame too, so a state change shows up as
+    # a full-window change on its own. Buttons are drawn with pygame.draw, which
+    # is not tracked, so their rects are always pushed.
+    #
+    # When the camera scrolls, every board blit moves, so the whole window is
+    # pushed once instead of the old and new rect of each. Otherwise
+    # overlapping rects are merged, and if they would still cover the window
+    # it is pushed whole.
+    def __init__(self, screen):
+        self.screen = screen
+        self.frame = FrameBuffer(screen.get_size(), screen)
+        self.screen_rect = screen.get_rect()
+        self.previous = None
+        self.previous_view = None
+        self.pixels = 0
+        self.texts = TextCache()
+
+    def invalidate(self):
+        # Push the whole window on the next frame (e.g. after an expose event)
+        self.previous = None
+
+    def draw_counter(self):
+        text = self.texts.render("pixels", get_font(20), f"PUSHED: {self.pixels:,} px", TEXT_SECONDARY)
+        self.frame.blit(text, text.get_rect(bottomright=(WINDOW_WIDTH - 5, WINDOW_HEIGHT - 5)))
+
+    @staticmethod
+    def merge(rects):
+        # Unions of overlapping rects, so no pixel is pushed twice
+        merged = []
+        for rect in rects:
+            i = 0
+            while i < len(merged):
+                if rect.colliderect(merged[i]):
+                    rect = rect.union(merged.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(rect)
+        return merged
+
+    def present(self, buttons, view=None):
+        # view: the camera offset this frame was drawn at
+        frame = self.frame
+        screen_area = self.screen_rect.width * self.screen_rect.height
+        if self.previous is None or view != self.previous_view:
+            rects = [self.screen_rect.copy()]
+        else:
+            changed = frame.drawn ^ self.previous
+            rects = [pygame.Rect(rect) for source, rect, area in changed]
+            rects.extend(button.rect for button in buttons)
+            rects = [rect.clip(self.screen_rect) for rect in rects]
+            rects = self.merge([rect for rect in rects if rect.width and rect.height])
+            if sum(rect.width * rect.height for rect in rects) >= screen_area:
+                rects = [self.screen_rect.copy()]
+
+        for rect in rects:
+            self.screen.blit(frame, rect, rect)
+        pygame.display.update(rects)
+
+        self.pixels = sum(rect.width * rect.height for rect in rects)
+        log.debug("pushed %d px in %d rects", self.pixels, len(rects))
+        self.previous = frame.drawn
+        self.previous_view = view
+        frame.drawn = set()
+
 class Game:
-    def __init__(self):
-        self.snake = Snake()
-        self.food = Food()
-        self.score = 0
+    def __init__(self, scores=None, board_width=CELL_NUMBER_X, board_height=CELL_NUMBER_Y, cell_size=CELL_SIZE):
+        self.engine = SnakeEngine(board_width, board_height)
+        self.camera = Camera(board_width, board_height, cell_size,
+                             (0, UI_HEIGHT, WINDOW_WIDTH, WINDOW_HEIGHT - UI_HEIGHT))
+        self.sprites = SpriteCache(cell_size)
+        self.snake = Snake(self.engine, self.sprites, self.camera)
+        self.food = Food(self.engine, self.sprites, self.camera)
+        # Without a store, scores go to the per-user database, never the cwd
+        self.scores = scores if scores is not None else ScoreStore()
         self.high_score = self.load_high_score()
+        self.started_at = time.monotonic()
         self.state = MENU
-        self.particles = []
-        self.speed = 150
-        
-        # Fonts
-        self.title_font = pygame.font.Font(None, 72)
-        self.large_font = pygame.font.Font(None, 48)
-        self.medium_font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+        self.particles = ParticleSystem(PARTICLE_COLORS, max_life=PARTICLE_LIFE)
+        # Direction changes waiting for their tick, one applied per tick
+        self.inputs = InputQueue()
+
+        # Every game is seeded and recorded so it can be replayed exactly
+        self.seed = None
+        self.recorder = None
+        self.replay_player = None
+        self.last_replay = None
+        self.replay_dir = None
+        # Drives the snake instead of the keyboard when set
+        self.autopilot = None
+
+        # Pre-composed static layers and HUD text
+        self.layers = {}
+        self.texts = TextCache()
         
         # Buttons
-        self.start_button = Button(WINDOW_WIDTH // 2 - 100, 350, 200, 50, "START GAME", self.medium_font)
-        self.restart_button = Button(WINDOW_WIDTH // 2 - 100, 400, 200, 50, "PLAY AGAIN", self.medium_font)
-        self.menu_button = Button(WINDOW_WIDTH // 2 - 100, 460, 200, 50, "MAIN MENU", self.medium_font)
+        self.start_button = Button(WINDOW_WIDTH // 2 - 100, 350, 200, 50, "START GAME", 36)
+        self.autopilot_button = Button(WINDOW_WIDTH // 2 - 100, 415, 200, 50, "AUTOPILOT", 36)
+        self.restart_button = Button(WINDOW_WIDTH // 2 - 100, 400, 200, 50, "PLAY AGAIN", 36)
+        self.menu_button = Button(WINDOW_WIDTH // 2 - 100, 460, 200, 50, "MAIN MENU", 36)
+
+    @property
+    def score(self):
+        return self.engine.score
+
+    @property
+    def speed(self):
+        return self.engine.speed
+
+    # Fonts
+    @property
+    def title_font(self):
+        return get_font(72)
+
+    @property
+    def large_font(self):
+        return get_font(48)
+
+    @property
+    def medium_font(self):
+        return get_font(36)
+
+    @property
+    def small_font(self):
+        return get_font(24)
         
     def load_high_score(self):
-        try:
-            if os.path.exists("high_score.json"):
-                with open("high_score.json", "r") as f:
-                    return json.load(f)["high_score"]
-        except:
-            pass
-        return 0
+        return self.scores.high_score()
     
-    def save_high_score(self):
-        try:
-            with open("high_score.json", "w") as f:
-                json.dump({"high_score": self.high_score}, f)
-        except:
-            pass
+    def record_run(self):
+        # Queued for the score store's writer thread; never blocks the frame
+        replay = self.last_replay
+        self.scores.record(self.score, len(self.engine.body), time.monotonic() - self.started_at,
+                           replay.ticks, self.seed, replay.to_bytes())
             
+    def queue_turn(self, direction, pressed_at=None):
+        # Checked against the direction the snake will have when this turn is
+        # applied, so quick presses inside one tick can't reverse it
+        if self.replay_player or self.autopilot:
+            return
+        self.inputs.push(direction, self.engine.direction, pressed_at)
+
     def update(self):
         if self.state == PLAYING:
+            if self.replay_player:
+                if self.replay_player.done:
+                    self.state = GAME_OVER
+                    return
+                self.engine.direction = self.replay_player.next_direction()
+            elif self.autopilot:
+                self.snake.direction = self.autopilot.next_direction()
+            else:
+                direction = self.inputs.pop(self.engine.direction)
+                if direction is not None:
+                    self.engine.direction = direction
+            if self.recorder:
+                self.recorder.record(self.engine.direction)
             self.snake.move_snake()
             self.check_collision()
             self.check_fail()
             
             # Update particles
-            self.particles = [p for p in self.particles if p.life > 0]
-            for particle in self.particles:
-                particle.update()
+            self.particles.update()
         
     def check_collision(self):
-        if self.food.pos == self.snake.body[0]:
-            # Create particles at food position
-            food_x = int(self.food.pos.x * CELL_SIZE + CELL_SIZE // 2)
-            food_y = int(self.food.pos.y * CELL_SIZE + CELL_SIZE // 2) + 100
-            for _ in range(15):
-                color = random.choice(PARTICLE_COLORS)
-                self.particles.append(Particle(food_x, food_y, color))
-            
-            self.food.randomize()
-            self.snake.add_block()
-            self.score += 10
-            
-            # Increase speed slightly
-            if self.speed > 80:
-                self.speed -= 2
-            
-            # Make sure food doesn't spawn on snake
-            for block in self.snake.body[1:]:
-                if block == self.food.pos:
-                    self.food.randomize()
+        if self.engine.eat():
+            # Create particles at the eaten food's position (now the head), in
+            # board pixels
+            head_x, head_y = self.engine.xy(self.engine.head)
+            cell = self.camera.cell_size
+            self.particles.emit(head_x * cell + cell // 2, head_y * cell + cell // 2, PARTICLES_PER_FOOD)
                     
     def check_fail(self):
-        if self.snake.check_collision():
-            if self.score > self.high_score:
-                self.high_score = self.score
-                self.save_high_score()
+        # A collision ends the game, and so does filling the board (a win)
+        if self.snake.check_collision() or self.engine.won:
+            self.engine.done = True
+            self.finish_replay()
+            if self.autopilot:
+                log.info("autopilot scored %d: %s", self.score, self.autopilot.summary())
+            elif not self.replay_player:
+                log.info("input: %s", self.inputs.summary())
+                self.record_run()
+                self.high_score = max(self.high_score, self.score)
             self.state = GAME_OVER
+
+    def finish_replay(self, finished=True):
+        # Keeps the replay of the game just played, saving it if asked to
+        if not self.recorder:
+            return
+        self.last_replay = self.recorder.finish(self.score, finished)
+        self.recorder = None
+        if self.replay_dir:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            path = os.path.join(self.replay_dir, f"snake-{self.seed}-{self.score}.snkr")
+            self.last_replay.save(path)
+            log.info("saved replay %s", path)
     
-    def reset_game(self):
-        self.snake.reset()
-        self.food.randomize()
-        self.score = 0
-        self.speed = 150
-        self.particles = []
+    def reset_game(self, seed=None, autopilot=False):
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.engine.rng = random.Random(self.seed)
+        self.particles.seed(self.seed)
+        self.engine.reset()
+        self.started_at = time.monotonic()
+        self.recorder = ReplayRecorder(self.seed, self.engine.width, self.engine.height)
+        self.replay_player = None
+        self.autopilot = Autopilot(self.engine) if autopilot else None
+        self.snake.trail = []
+        self.particles.clear()
+        self.inputs.clear()
         self.state = PLAYING
     
-    def draw_grid(self, screen):
-        # Modern subtle grid
-        for x in range(0, WINDOW_WIDTH, CELL_SIZE):
-            pygame.draw.line(screen, GRID_COLOR, (x, 100), (x, WINDOW_HEIGHT), 1)
-        for y in range(100, WINDOW_HEIGHT, CELL_SIZE):
-            pygame.draw.line(screen, GRID_COLOR, (0, y), (WINDOW_WIDTH, y), 1)
-    
-    def draw_ui(self, screen):
+    def start_replay(self, replay):
+        # Plays a recorded game back through the normal update loop
+        self.reset_game(replay.seed)
+        self.recorder = None
+        self.replay_player = ReplayPlayer(replay)
+
+    def layer(self, name, *key):
+        # Static layers are composed once and rebuilt only when `key` changes
+        cached = self.layers.get(name)
+        if cached is None or cached[0] != key:
+            surface = getattr(self, "build_" + name + "_layer")(*key)
+            if pygame.display.get_surface() is not None:
+                if surface.get_flags() & pygame.SRCALPHA:
+                    surface = surface.convert_alpha()
+                else:
+                    surface = surface.convert()
+            cached = self.layers[name] = (key, surface)
+        return cached[1]
+
+    def build_grid_layer(self, cell, view_width, view_height):
+        # Modern subtle grid, one cell larger than the viewport so it can be
+        # blitted at any scroll offset
+        width, height = view_width + cell, view_height + cell
+        surface = pygame.Surface((width, height))
+        surface.fill(BACKGROUND)
+        for x in range(0, width, cell):
+            pygame.draw.line(surface, GRID_COLOR, (x, 0), (x, height), 1)
+        for y in range(0, height, cell):
+            pygame.draw.line(surface, GRID_COLOR, (0, y), (width, y), 1)
+        return surface
+
+    def build_ui_layer(self, show_controls):
         # Top UI bar
-        ui_rect = pygame.Rect(0, 0, WINDOW_WIDTH, 100)
-        pygame.draw.rect(screen, (20, 20, 35), ui_rect)
-        pygame.draw.line(screen, ACCENT_COLOR, (0, 100), (WINDOW_WIDTH, 100), 2)
-        
-        # Score
-        score_text = self.large_font.render(f"SCORE: {self.score}", True, TEXT_PRIMARY)
-        screen.blit(score_text, (30, 30))
-        
-        # High Score
-        high_score_text = self.medium_font.render(f"HIGH: {self.high_score}", True, TEXT_SECONDARY)
-        screen.blit(high_score_text, (30, 65))
-        
-        # Speed indicator
-        speed_text = self.small_font.render(f"SPEED: {int((200-self.speed)/2)}", True, TEXT_SECONDARY)
-        screen.blit(speed_text, (WINDOW_WIDTH - 150, 30))
+        surface = pygame.Surface((WINDOW_WIDTH, 102), pygame.SRCALPHA)
+        pygame.draw.rect(surface, (20, 20, 35), (0, 0, WINDOW_WIDTH, 100))
+        pygame.draw.line(surface, ACCENT_COLOR, (0, 100), (WINDOW_WIDTH, 100), 2)
         
         # Controls hint
-        if self.state == PLAYING:
+        if show_controls:
             controls_text = self.small_font.render("ARROW KEYS TO MOVE • SPACE TO PAUSE", True, TEXT_SECONDARY)
             text_rect = controls_text.get_rect(center=(WINDOW_WIDTH // 2, 75))
-            screen.blit(controls_text, text_rect)
-    
-    def draw_menu(self, screen):
-        # Background gradient effect
+            surface.blit(controls_text, text_rect)
+        return surface
+
+    def build_menu_layer(self, high_score):
+        surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+
+        # Background gradient effect, drawn as one column and stretched
+        gradient = pygame.Surface((1, WINDOW_HEIGHT))
         for y in range(WINDOW_HEIGHT):
             color_ratio = y / WINDOW_HEIGHT
             r = int(BACKGROUND[0] * (1 - color_ratio) + 30 * color_ratio)
             g = int(BACKGROUND[1] * (1 - color_ratio) + 30 * color_ratio)
             b = int(BACKGROUND[2] * (1 - color_ratio) + 50 * color_ratio)
-            pygame.draw.line(screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
+            gradient.set_at((0, y), (r, g, b))
+        pygame.transform.scale(gradient, (WINDOW_WIDTH, WINDOW_HEIGHT), surface)
         
         # Title with glow effect
         title_text = self.title_font.render("SNAKE 2025", True, ACCENT_COLOR)
         title_rect = title_text.get_rect(center=(WINDOW_WIDTH // 2, 150))
-        
-        # Glow effect
         for offset in range(5, 0, -1):
-            glow_color = (*ACCENT_COLOR, 50)
-            glow_surf = pygame.Surface(title_text.get_size(), pygame.SRCALPHA)
-            glow_surf.blit(title_text, (0, 0))
-            screen.blit(glow_surf, (title_rect.x - offset, title_rect.y - offset))
-        
-        screen.blit(title_text, title_rect)
+            surface.blit(title_text, (title_rect.x - offset, title_rect.y - offset))
+        surface.blit(title_text, title_rect)
         
         # Subtitle
         subtitle_text = self.medium_font.render("Modern Snake Experience", True, TEXT_SECONDARY)
         subtitle_rect = subtitle_text.get_rect(center=(WINDOW_WIDTH // 2, 200))
-        screen.blit(subtitle_text, subtitle_rect)
+        surface.blit(subtitle_text, subtitle_rect)
         
         # High score display
-        if self.high_score > 0:
-            high_score_text = self.large_font.render(f"Best Score: {self.high_score}", True, TEXT_PRIMARY)
+        if high_score > 0:
+            high_score_text = self.large_font.render(f"Best Score: {high_score}", True, TEXT_PRIMARY)
             high_score_rect = high_score_text.get_rect(center=(WINDOW_WIDTH // 2, 280))
-            screen.blit(high_score_text, high_score_rect)
+            surface.blit(high_score_text, high_score_rect)
         
         # Instructions
         instructions = [
@@ -389,30 +708,77 @@ class Game:
         for i, instruction in enumerate(instructions):
             text = self.small_font.render(instruction, True, TEXT_SECONDARY)
             text_rect = text.get_rect(center=(WINDOW_WIDTH // 2, 500 + i * 25))
-            screen.blit(text, text_rect)
+            surface.blit(text, text_rect)
+        return surface
+
+    def build_overlay(self, alpha):
+        # Semi-transparent overlay
+        surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, alpha))
+        return surface
+
+    def build_game_over_overlay_layer(self):
+        return self.build_overlay(180)
+
+    def build_pause_overlay_layer(self):
+        return self.build_overlay(120)
+
+    def draw_grid(self, screen):
+        # Only the part of the board in view
+        camera = self.camera
+        cell = camera.cell_size
+        grid = self.layer("grid", cell, camera.viewport.width, camera.viewport.height)
+        rect = camera.board_rect()
+        screen.blit(grid, rect, ((camera.x + rect.x - camera.viewport.x) % cell,
+                                 (camera.y + rect.y - camera.viewport.y) % cell, rect.width, rect.height))
+    
+    def draw_ui(self, screen):
+        screen.blit(self.layer("ui", self.state == PLAYING), (0, 0))
+        
+        # Score
+        score_text = self.texts.render("score", self.large_font, f"SCORE: {self.score}", TEXT_PRIMARY)
+        screen.blit(score_text, (30, 30))
+        
+        # High Score
+        high_score_text = self.texts.render("high_score", self.medium_font, f"HIGH: {self.high_score}", TEXT_SECONDARY)
+        screen.blit(high_score_text, (30, 65))
+        
+        # Speed indicator
+        speed_text = self.texts.render("speed", self.small_font, f"SPEED: {int((200-self.speed)/2)}", TEXT_SECONDARY)
+        screen.blit(speed_text, (WINDOW_WIDTH - 150, 30))
+
+        # Autopilot planning time for the last tick
+        if self.autopilot:
+            plan_text = self.texts.render("autopilot", self.small_font, f"AUTO: {self.autopilot.last_ms:.1f} ms",
+                                          ACCENT_COLOR)
+            screen.blit(plan_text, (WINDOW_WIDTH - 150, 55))
+    
+    def draw_menu(self, screen):
+        screen.blit(self.layer("menu", self.high_score), (0, 0))
         
-        # Start button
+        # Start buttons
         self.start_button.draw(screen)
+        self.autopilot_button.draw(screen)
     
     def draw_game_over(self, screen):
-        # Semi-transparent overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        screen.blit(overlay, (0, 0))
+        screen.blit(self.layer("game_over_overlay"), (0, 0))
         
         # Game Over text with effect
-        game_over_text = self.title_font.render("GAME OVER", True, (255, 100, 100))
+        if self.engine.won:
+            game_over_text = self.texts.render("game_over", self.title_font, "YOU WIN!", ACCENT_COLOR)
+        else:
+            game_over_text = self.texts.render("game_over", self.title_font, "GAME OVER", (255, 100, 100))
         game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, 200))
         screen.blit(game_over_text, game_over_rect)
         
         # Final score
-        final_score_text = self.large_font.render(f"Final Score: {self.score}", True, TEXT_PRIMARY)
+        final_score_text = self.texts.render("final_score", self.large_font, f"Final Score: {self.score}", TEXT_PRIMARY)
         final_score_rect = final_score_text.get_rect(center=(WINDOW_WIDTH // 2, 280))
         screen.blit(final_score_text, final_score_rect)
         
         # New high score message
         if self.score == self.high_score and self.score > 0:
-            new_high_text = self.medium_font.render("NEW HIGH SCORE!", True, ACCENT_COLOR)
+            new_high_text = self.texts.render("new_high", self.medium_font, "NEW HIGH SCORE!", ACCENT_COLOR)
             new_high_rect = new_high_text.get_rect(center=(WINDOW_WIDTH // 2, 320))
             screen.blit(new_high_text, new_high_rect)
         
@@ -421,30 +787,47 @@ class Game:
         self.menu_button.draw(screen)
     
     def draw_pause(self, screen):
-        # Semi-transparent overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 120))
-        screen.blit(overlay, (0, 0))
+        screen.blit(self.layer("pause_overlay"), (0, 0))
         
         # Pause text
-        pause_text = self.title_font.render("PAUSED", True, TEXT_PRIMARY)
+        pause_text = self.texts.render("pause", self.title_font, "PAUSED", TEXT_PRIMARY)
         pause_rect = pause_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
         screen.blit(pause_text, pause_rect)
         
         # Resume instruction
-        resume_text = self.medium_font.render("Press SPACE to resume", True, TEXT_SECONDARY)
+        resume_text = self.texts.render("resume", self.medium_font, "Press SPACE to resume", TEXT_SECONDARY)
         resume_rect = resume_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 60))
         screen.blit(resume_text, resume_rect)
     
-    def draw_elements(self, screen):
+    def visible_buttons(self):
+        if self.state == MENU:
+            return [self.start_button, self.autopilot_button]
+        if self.state == GAME_OVER:
+            return [self.restart_button, self.menu_button]
+        return []
+
+    def profile_targets(self):
+        # Methods timed by the frame profiler: (object, method, section)
+        return [
+            (self, "update", "update"),
+            (self, "draw_grid", "draw_grid"),
+            (self.snake, "draw_snake", "draw_snake"),
+            (self.food, "draw_food", "draw_food"),
+            (self.particles, "draw", "particles"),
+            (self, "draw_ui", "draw_ui"),
+        ]
+
+    def draw_elements(self, screen, alpha=1.0):
+        # alpha interpolates the snake between the last two ticks
+        if self.state != MENU:
+            self.camera.follow(*self.snake.head_position(1.0 if self.state == GAME_OVER else alpha))
         if self.state == PLAYING or self.state == PAUSED:
             self.draw_grid(screen)
             self.food.draw_food(screen)
-            self.snake.draw_snake(screen)
+            self.snake.draw_snake(screen, alpha)
             
             # Draw particles
-            for particle in self.particles:
-                particle.draw(screen)
+            self.particles.draw(screen, self.sprites, self.camera.offset())
             
             self.draw_ui(screen)
             
@@ -462,77 +845,254 @@ class Game:
             self.draw_ui(screen)
             self.draw_game_over(screen)
 
-def main():
+def board_size(text):
+    # "WIDTHxHEIGHT" in cells, for --board
+    try:
+        width, height = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    if not 3 <= width <= 65535 or not 2 <= height <= 65535:
+        raise argparse.ArgumentTypeError("the board must be at least 3x2 and at most 65535 cells a side")
+    return width, height
+
+def cell_size(text):
+    # Pixels per cell, for --cell-size
+    try:
+        size = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number of pixels, got {text!r}")
+    if size < 1:
+        raise argparse.ArgumentTypeError("the cell size must be at least 1 pixel")
+    return size
+
+def replay_speed(text):
+    # Speed multiplier, for --replay-speed; a tick interval of zero or less
+    # would never let the frame loop finish
+    try:
+        speed = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, got {text!r}")
+    if not 0 < speed < math.inf:
+        raise argparse.ArgumentTypeError("the replay speed must be a positive number")
+    return speed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Snake 2025 - Modern Edition")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="push only changed screen regions instead of flipping the whole window")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="logging level, e.g. DEBUG to log pixels pushed per frame")
+    parser.add_argument("--no-interpolation", action="store_true",
+                        help="draw the snake on whole cells instead of interpolating between ticks")
+    parser.add_argument("--timing-report", action="store_true",
+                        help="print tick and frame jitter and input latency histograms on exit")
+    parser.add_argument("--record-replays", metavar="DIR",
+                        help="save a replay of every game into DIR")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="watch a recorded replay")
+    parser.add_argument("--replay-speed", type=replay_speed, default=1.0,
+                        help="speed multiplier for --replay")
+    parser.add_argument("--board", type=board_size, default=(CELL_NUMBER_X, CELL_NUMBER_Y), metavar="WxH",
+                        help=f"board size in cells (default {CELL_NUMBER_X}x{CELL_NUMBER_Y})")
+    parser.add_argument("--cell-size", type=cell_size, default=CELL_SIZE, metavar="PX",
+                        help=f"cell size in pixels (default {CELL_SIZE}); larger boards scroll")
+    parser.add_argument("--scores", metavar="PATH",
+                        help="score history database (default: scores.db in the user's data directory)")
+    parser.add_argument("--profile", action="store_true",
+                        help="show the frame-time overlay from the start (F3 toggles it)")
+    parser.add_argument("--profile-csv", metavar="PATH",
+                        help="write per-frame section times to a CSV file")
+    parser.add_argument("--profile-pstats", metavar="PATH",
+                        help="run under cProfile and dump pstats to PATH on exit")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="let the autopilot play, starting a new game after each one (attract mode)")
+    export = parser.add_mutually_exclusive_group()
+    export.add_argument("--export-png", metavar="DIR",
+                        help="save every frame as a PNG into DIR while playing")
+    export.add_argument("--export-raw", metavar="PATH",
+                        help="stream every frame as raw RGB to PATH while playing")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print how long startup took, up to the first frame, and exit")
+    return parser.parse_args(argv)
+
+def format_startup(marks):
+    # "imports 180 ms, display 4 ms, ... total 210 ms" from (stage, time) marks
+    previous = IMPORT_STARTED
+    parts = []
+    for stage, at in marks:
+        parts.append(f"{stage} {(at - previous) * 1000:.0f} ms")
+        previous = at
+    parts.append(f"total {(previous - IMPORT_STARTED) * 1000:.0f} ms")
+    return ", ".join(parts)
+
+def main(argv=None):
+    startup = [("imports", time.perf_counter())]
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(name)s: %(message)s")
+
     # Set up the display
+    init_pygame()
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption("Snake 2025 - Modern Edition")
     clock = pygame.time.Clock()
+    startup.append(("display", time.perf_counter()))
     
-    # Create game instance
-    game = Game()
+    # Create game instance; a replay brings its own board size
+    replay = Replay.load(args.replay) if args.replay else None
+    board_width, board_height = (replay.width, replay.height) if replay else args.board
+    game = Game(ScoreStore(args.scores), board_width, board_height, args.cell_size)
+    startup.append(("game", time.perf_counter()))
+    renderer = DirtyRectRenderer(screen) if args.dirty_rects else None
+    game.replay_dir = args.record_replays
+    if replay:
+        game.start_replay(replay)
+    elif args.autopilot:
+        game.reset_game(autopilot=True)
+    game_over_at = None
     
-    # Game update timer
-    SCREEN_UPDATE = pygame.USEREVENT
-    pygame.time.set_timer(SCREEN_UPDATE, game.speed)
+    # Simulation ticks every game.speed ms, independent of the frame rate
+    timestep = FixedTimestep()
+
+    # Frame-time instrumentation; costs nothing until it is switched on
+    profiler = FrameProfiler()
+    profiler.add_section("flip")
+    keep_profiling = bool(args.profile_csv or args.profile_pstats)
+    show_profile = args.profile
+    if show_profile or keep_profiling:
+        profiler.enable(game.profile_targets())
+    if args.profile_csv:
+        profiler.open_csv(args.profile_csv)
+    if args.profile_pstats:
+        profiler.start_cprofile(args.profile_pstats)
+
+    # Frames are encoded on a background thread; ones it can't keep up with
+    # are dropped rather than slowing the game down
+    exporter = None
+    if args.export_png or args.export_raw:
+        exporter = FrameExporter(args.export_png, args.export_raw)
     
     # Game loop
     running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            
-            # Handle button events
-            if game.state == MENU:
-                if game.start_button.handle_event(event):
-                    game.reset_game()
+    try:
+        while running:
+            if profiler.enabled:
+                profiler.begin_frame()
+            events = pygame.event.get()
+            # pygame gives events no timestamps, so key presses are stamped as
+            # they are read, at most a frame after they happened
+            read_at = time.perf_counter()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED) and renderer:
+                    renderer.invalidate()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    show_profile = not show_profile
+                    if not keep_profiling:
+                        profiler.toggle(game.profile_targets())
             
-            elif game.state == GAME_OVER:
-                if game.restart_button.handle_event(event):
-                    game.reset_game()
-                elif game.menu_button.handle_event(event):
-                    game.state = MENU
+                # Handle button events
+                if game.state == MENU:
+                    if game.start_button.handle_event(event):
+                        game.reset_game()
+                    elif game.autopilot_button.handle_event(event):
+                        game.reset_game(autopilot=True)
             
-            # Game update timer
-            if event.type == SCREEN_UPDATE and game.state == PLAYING:
-                game.update()
-                # Update timer speed
-                pygame.time.set_timer(SCREEN_UPDATE, game.speed)
+                elif game.state == GAME_OVER:
+                    if game.restart_button.handle_event(event):
+                        game.reset_game(autopilot=game.autopilot is not None)
+                    elif game.menu_button.handle_event(event):
+                        game.state = MENU
             
-            # Keyboard controls
-            if event.type == pygame.KEYDOWN:
-                if game.state == PLAYING:
-                    if event.key == pygame.K_UP and game.snake.direction.y != 1:
-                        game.snake.direction = pygame.Vector2(0, -1)
-                    elif event.key == pygame.K_DOWN and game.snake.direction.y != -1:
-                        game.snake.direction = pygame.Vector2(0, 1)
-                    elif event.key == pygame.K_RIGHT and game.snake.direction.x != -1:
-                        game.snake.direction = pygame.Vector2(1, 0)
-                    elif event.key == pygame.K_LEFT and game.snake.direction.x != 1:
-                        game.snake.direction = pygame.Vector2(-1, 0)
-                    elif event.key == pygame.K_SPACE:
-                        game.state = PAUSED
+                # Keyboard controls
+                if event.type == pygame.KEYDOWN:
+                    if game.state == PLAYING:
+                        if event.key == pygame.K_UP:
+                            game.queue_turn(UP, read_at)
+                        elif event.key == pygame.K_DOWN:
+                            game.queue_turn(DOWN, read_at)
+                        elif event.key == pygame.K_RIGHT:
+                            game.queue_turn(RIGHT, read_at)
+                        elif event.key == pygame.K_LEFT:
+                            game.queue_turn(LEFT, read_at)
+                        elif event.key == pygame.K_SPACE:
+                            game.state = PAUSED
+                        elif event.key == pygame.K_ESCAPE and game.autopilot:
+                            game.state = MENU
                 
-                elif game.state == PAUSED:
-                    if event.key == pygame.K_SPACE:
-                        game.state = PLAYING
+                    elif game.state == PAUSED:
+                        if event.key == pygame.K_SPACE:
+                            game.state = PLAYING
                 
-                elif game.state == MENU:
-                    if event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
-                        game.reset_game()
+                    elif game.state == MENU:
+                        if event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
+                            game.reset_game()
+                        elif event.key == pygame.K_a:
+                            game.reset_game(autopilot=True)
                 
-                elif game.state == GAME_OVER:
-                    if event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
-                        game.reset_game()
-                    elif event.key == pygame.K_ESCAPE:
-                        game.state = MENU
+                    elif game.state == GAME_OVER:
+                        if event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
+                            game.reset_game(autopilot=game.autopilot is not None)
+                        elif event.key == pygame.K_ESCAPE:
+                            game.state = MENU
         
-        # Draw everything
-        screen.fill(BACKGROUND)
-        game.draw_elements(screen)
-        pygame.display.flip()
-        clock.tick(60)
-    
+            # Run the simulation ticks that are due
+            timestep.begin_frame(game.state == PLAYING)
+            speed_up = args.replay_speed if game.replay_player else 1.0
+            while game.state == PLAYING and timestep.tick_due(game.speed / 1000 / speed_up):
+                game.update()
+            if game.state not in (PLAYING, PAUSED):
+                timestep.reset()
+
+            # Attract mode: the next autopilot game starts on its own
+            if args.autopilot and game.state == GAME_OVER:
+                if game_over_at is None:
+                    game_over_at = time.monotonic()
+                elif time.monotonic() - game_over_at > AUTOPILOT_RESTART:
+                    game.reset_game(autopilot=True)
+            else:
+                game_over_at = None
+            alpha = 1.0 if args.no_interpolation else timestep.alpha(game.speed / 1000 / speed_up)
+        
+            # Draw everything
+            target = renderer.frame if renderer else screen
+            target.fill(BACKGROUND)
+            game.draw_elements(target, alpha)
+            if renderer:
+                renderer.draw_counter()
+            if show_profile:
+                profiler.draw_overlay(target, get_font(20), TEXT_PRIMARY, (20, 20, 35))
+            # Menus and the game over screen are not exported
+            if exporter and game.state in (PLAYING, PAUSED):
+                exporter.capture(target)
+
+            present = (lambda: renderer.present(game.visible_buttons(), game.camera.offset())) if renderer else pygame.display.flip
+            if profiler.enabled:
+                profiler.call("flip", present)
+                profiler.end_frame()
+            else:
+                present()
+            if startup:
+                startup.append(("first frame", time.perf_counter()))
+                log.info("startup %s", format_startup(startup))
+                if args.startup_time:
+                    print(f"startup: {format_startup(startup)}")
+                    running = False
+                startup = None
+            clock.tick(60)
+    finally:
+        # Runs even when the loop fails, e.g. on an export error, so the
+        # replay, scores and exported frames are always saved
+        if game.state in (PLAYING, PAUSED):
+            game.finish_replay(finished=False)
+        game.scores.close()
+        profiler.close()
+        if exporter:
+            exporter.close()
+            log.info("export: %s", exporter.summary())
+    if args.timing_report:
+        print(timestep.report())
+        print(game.inputs.report())
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,83 @@
+import time
+from collections import deque
+
+from snake_engine import is_reverse
+from snake_loop import JitterHistogram
+from snake_profile import percentile
+
+# Keyboard input between the event loop and the simulation. Key presses are
+# timestamped as they are read from pygame's event queue and wait in a small
+# bounded queue; each tick takes at most one, just before the snake moves.
+#
+# A press is checked against the direction the snake will have when it is
+# applied (the last queued turn, or the current direction), so two quick
+# presses inside one tick can never reverse the snake into itself. When the
+# queue is full the new press is dropped rather than the oldest: every queued
+# turn was validated against the one before it, so removing one from the
+# front could let a reversal through.
+#
+# For every applied turn the time from key press to the move it caused is
+# recorded, so responsiveness can be measured at any speed.
+
+CAPACITY = 3
+WINDOW = 1000  # applied turns kept for the latency percentiles
+
+
+class InputQueue:
+    def __init__(self, capacity=CAPACITY, clock=time.perf_counter, window=WINDOW):
+        self.capacity = capacity
+        self.clock = clock
+        # (direction, pressed at)
+        self.pending = deque()
+        self.latencies = deque(maxlen=window)
+        self.histogram = JitterHistogram(bucket_ms=10, limit_ms=200)
+        self.applied = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def push(self, direction, current, pressed_at=None):
+        # Queues a turn for a snake now heading `current`; returns False if
+        # it was rejected (no change, or a reversal) or dropped (queue full)
+        upcoming = self.pending[-1][0] if self.pending else current
+        if direction == upcoming or is_reverse(direction, upcoming):
+            self.rejected += 1
+            return False
+        if len(self.pending) >= self.capacity:
+            self.dropped += 1
+            return False
+        self.pending.append((direction, self.clock() if pressed_at is None else pressed_at))
+        return True
+
+    def pop(self, current):
+        # The turn to apply on this tick, or None; call right before the move
+        while self.pending:
+            direction, pressed_at = self.pending.popleft()
+            if is_reverse(direction, current):
+                self.rejected += 1
+                continue
+            latency = (self.clock() - pressed_at) * 1000
+            self.latencies.append(latency)
+            self.histogram.add(latency)
+            self.applied += 1
+            return direction
+        return None
+
+    def clear(self):
+        # Drops pending turns, e.g. on a new game; the metrics are kept
+        self.pending.clear()
+
+    def percentiles(self):
+        # (p50, p99, max) press-to-move latency in milliseconds
+        latencies = sorted(self.latencies)
+        return percentile(latencies, 0.50), percentile(latencies, 0.99), latencies[-1] if latencies else 0.0
+
+    def summary(self):
+        p50, p99, worst = self.percentiles()
+        return (f"{self.applied} turns, {self.rejected} rejected, {self.dropped} dropped; "
+                f"press to move p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms")
+
+    def report(self):
+        return "\n".join((self.histogram.format("Input latency (press to move)"), self.summary()))
@@ -0,0 +1,97 @@
+import time
+
+# Fixed-timestep game loop support. The simulation advances in whole ticks of
+# Game.speed milliseconds, decoupled from the frame rate: every frame adds the
+# real elapsed time to an accumulator and runs as many ticks as are due. The
+# fraction of a tick left over is the interpolation factor for rendering.
+
+# After a stall, at most this many ticks run per frame; the rest of the
+# backlog is caught up over the following frames
+MAX_TICKS_PER_FRAME = 8
+# Backlog beyond this many seconds is dropped instead of caught up
+MAX_BACKLOG = 1.0
+
+
+class JitterHistogram:
+    # Histogram of deviations from a target interval, in millisecond buckets
+    def __init__(self, bucket_ms=2, limit_ms=40):
+        self.bucket_ms = bucket_ms
+        self.limit_ms = limit_ms
+        self.counts = {}
+        self.samples = 0
+        self.total_abs = 0.0
+
+    def add(self, deviation_ms):
+        bucket = int(deviation_ms // self.bucket_ms) * self.bucket_ms
+        bucket = max(-self.limit_ms, min(self.limit_ms, bucket))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.samples += 1
+        self.total_abs += abs(deviation_ms)
+
+    def mean_abs(self):
+        return self.total_abs / self.samples if self.samples else 0.0
+
+    def format(self, title, width=40):
+        lines = [f"{title}: {self.samples} samples, mean |deviation| {self.mean_abs():.2f} ms"]
+        if not self.samples:
+            return "\n".join(lines)
+        peak = max(self.counts.values())
+        for bucket in sorted(self.counts):
+            count = self.counts[bucket]
+            label = f"{bucket:+d}" if abs(bucket) < self.limit_ms else f"{bucket:+d}+"
+            lines.append(f"{label:>6} ms | {'#' * max(1, count * width // peak):<{width}} {count}")
+        return "\n".join(lines)
+
+
+class FixedTimestep:
+    def __init__(self, clock=time.perf_counter, max_ticks_per_frame=MAX_TICKS_PER_FRAME,
+                 max_backlog=MAX_BACKLOG, frame_interval=1 / 60):
+        self.clock = clock
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.max_backlog = max_backlog
+        self.frame_interval = frame_interval
+        self.tick_jitter = JitterHistogram()
+        self.frame_jitter = JitterHistogram()
+        self.last_frame = None
+        self.reset()
+
+    def reset(self):
+        # Drop any backlog, e.g. between games
+        self.accumulator = 0.0
+        self.last_tick = None
+        self.frame_ticks = 0
+
+    def begin_frame(self, running=True):
+        # While not running (e.g. paused) time is not accumulated, so the
+        # simulation resumes where it left off
+        now = self.clock()
+        if self.last_frame is not None:
+            elapsed = now - self.last_frame
+            self.frame_jitter.add((elapsed - self.frame_interval) * 1000)
+            if running:
+                self.accumulator = min(self.accumulator + elapsed, self.max_backlog)
+        if not running:
+            self.last_tick = None
+        self.last_frame = now
+        self.frame_ticks = 0
+
+    def tick_due(self, interval):
+        # True, consuming one tick of `interval` seconds, if a tick should run
+        if self.accumulator < interval or self.frame_ticks >= self.max_ticks_per_frame:
+            return False
+        self.accumulator -= interval
+        self.frame_ticks += 1
+
+        now = self.clock()
+        if self.last_tick is not None:
+            self.tick_jitter.add((now - self.last_tick - interval) * 1000)
+        self.last_tick = now
+        return True
+
+    def alpha(self, interval):
+        # How far the frame is between the last tick and the next one
+        return min(self.accumulator / interval, 1.0)
+
+    def report(self):
+        return "\n".join((self.tick_jitter.format("Tick interval jitter"),
+                          self.frame_jitter.format("Frame interval jitter")))
@@ -0,0 +1,107 @@
+import numpy as np
+
+# Particle effects kept in preallocated NumPy buffers. Slots of dead particles
+# go back on a free stack and are reused, so nothing is allocated per particle
+# and updates are vectorized over the whole pool.
+
+CAPACITY = 4096
+MAX_LIFE = 60
+DRAG = 0.98
+
+
+class ParticleSystem:
+    def __init__(self, colors, capacity=CAPACITY, max_life=MAX_LIFE, rng=None):
+        self.colors = list(colors)
+        self.capacity = capacity
+        self.max_life = max_life
+        # Created on first use: numpy.random is slow to import
+        self.rng = rng
+
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.int32)
+        # Stack of free slots; the top free_count entries are available
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+        # Sprite lookup [color][life][size], built on first draw
+        self.table = None
+        self.table_sprites = None
+
+    def seed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.capacity - self.free_count
+
+    def clear(self):
+        self.life[:] = 0
+        self.free = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = self.capacity
+
+    def emit(self, x, y, count):
+        # Burst of `count` particles at (x, y); drops what doesn't fit the pool
+        count = min(count, self.free_count)
+        if count <= 0:
+            return
+        self.free_count -= count
+        slots = self.free[self.free_count:self.free_count + count]
+
+        if self.rng is None:
+            self.rng = np.random.default_rng()
+        rng = self.rng
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = rng.uniform(-3, 3, count)
+        self.vy[slots] = rng.uniform(-3, 3, count)
+        self.size[slots] = rng.uniform(2, 5, count)
+        self.life[slots] = self.max_life
+        self.color[slots] = rng.integers(0, len(self.colors), count)
+
+    def update(self):
+        alive = self.life > 0
+        self.x += self.vx
+        self.y += self.vy
+        self.vx *= DRAG
+        self.vy *= DRAG
+        np.subtract(self.life, 1, out=self.life, where=alive)
+
+        expired = np.flatnonzero(alive & (self.life == 0)).astype(np.int32)
+        if len(expired):
+            self.free[self.free_count:self.free_count + len(expired)] = expired
+            self.free_count += len(expired)
+
+    def build_table(self, sprites):
+        # Discs fade with life: alpha and radius both scale with life / max_life
+        table = []
+        for color in self.colors:
+            by_life = [[]]
+            for life in range(1, self.max_life + 1):
+                alpha = int(255 * (life / self.max_life))
+                by_life.append([None] + [sprites.disc(color, size, alpha) for size in range(1, 6)])
+            table.append(by_life)
+        self.table = table
+        self.table_sprites = sprites
+
+    def draw(self, screen, sprites, offset=(0, 0)):
+        # Particle positions plus `offset` are window pixels
+        if len(self) == 0:
+            return
+        if self.table_sprites is not sprites:
+            self.build_table(sprites)
+
+        alive = np.flatnonzero(self.life > 0)
+        life = self.life[alive]
+        radius = (self.size[alive] * (life / self.max_life)).astype(np.int32)
+        visible = radius > 0
+        alive, life, radius = alive[visible], life[visible], radius[visible]
+        left = (self.x[alive] - radius + offset[0]).astype(np.int32)
+        top = (self.y[alive] - radius + offset[1]).astype(np.int32)
+
+        table = self.table
+        screen.blits([(table[color][life][size], (px, py)) for color, life, size, px, py in
+                      zip(self.color[alive].tolist(), life.tolist(), radius.tolist(),
+                          left.tolist(), top.tolist())], False)
@@ -0,0 +1,159 @@
+import cProfile
+import csv
+import time
+
+# Per-frame timing of the game's update and draw steps, with rolling
+# percentiles for an on-screen overlay and optional CSV / pstats dumps.
+#
+# Timing works by replacing the instrumented methods with timed wrappers
+# while the profiler is enabled and restoring them when it is disabled, so a
+# game that never turns profiling on runs exactly the code it would without it.
+
+WINDOW = 300  # frames kept for the rolling percentiles
+OVERLAY_REFRESH = 15  # frames between overlay text updates
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.enabled = False
+        self.sections = []
+        self.current = {}
+        self.history = {}
+        self.frame_start = None
+        self.frames = 0
+        self.installed = []
+        self.csv_file = None
+        self.csv_writer = None
+        self.cprofile = None
+        self.pstats_path = None
+        self.overlay_lines = []
+        self.overlay = None
+        self.overlay_source = None
+
+    def add_section(self, name):
+        if name not in self.history:
+            self.sections.append(name)
+            self.history[name] = [0.0] * self.window
+            self.current[name] = 0.0
+
+    def wrap(self, func, name):
+        self.add_section(name)
+        current = self.current
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                current[name] += clock() - start
+        return timed
+
+    def call(self, name, func, *args):
+        # Times a single call without installing a wrapper
+        self.add_section(name)
+        start = time.perf_counter()
+        result = func(*args)
+        self.current[name] += time.perf_counter() - start
+        return result
+
+    def enable(self, targets):
+        # targets: (object, method name, section name) to time
+        if self.enabled:
+            return
+        for obj, attr, name in targets:
+            self.installed.append((obj, attr))
+            setattr(obj, attr, self.wrap(getattr(obj, attr), name))
+        self.add_section("frame")
+        self.enabled = True
+        self.frame_start = None
+
+    def disable(self):
+        # Removes the wrappers, falling back to the class methods again
+        for obj, attr in self.installed:
+            delattr(obj, attr)
+        self.installed = []
+        self.enabled = False
+
+    def toggle(self, targets):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable(targets)
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.frame_start is not None:
+            self.current["frame"] += time.perf_counter() - self.frame_start
+        slot = self.frames % self.window
+        for name in self.sections:
+            self.history[name][slot] = self.current[name]
+            self.current[name] = 0.0
+        if self.csv_file and not self.csv_writer:
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame"] + [f"{name}_ms" for name in self.sections])
+        if self.csv_writer:
+            self.csv_writer.writerow([self.frames] + [f"{self.history[name][slot] * 1000:.4f}"
+                                                      for name in self.sections])
+        self.frames += 1
+        if self.frames % OVERLAY_REFRESH == 0:
+            self.overlay_lines = self.summary_lines()
+
+    def percentiles(self, name):
+        # (p50, p95, p99) in milliseconds over the rolling window
+        values = self.history[name][:min(self.frames, self.window)]
+        values = sorted(value * 1000 for value in values)
+        return percentile(values, 0.50), percentile(values, 0.95), percentile(values, 0.99)
+
+    def summary_lines(self):
+        lines = [f"{'section':<12} {'p50':>6} {'p95':>6} {'p99':>6} ms"]
+        for name in self.sections:
+            p50, p95, p99 = self.percentiles(name)
+            lines.append(f"{name:<12} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        return lines
+
+    def draw_overlay(self, screen, font, color, background, pos=(5, 105)):
+        # The overlay is re-rendered only when the figures are refreshed
+        if not self.overlay_lines:
+            return
+        if self.overlay_source is not self.overlay_lines:
+            import pygame
+
+            line_height = font.get_linesize()
+            rendered = [font.render(line, True, color) for line in self.overlay_lines]
+            width = max(surface.get_width() for surface in rendered)
+            self.overlay = pygame.Surface((width + 10, line_height * len(rendered) + 10))
+            self.overlay.fill(background)
+            for i, surface in enumerate(rendered):
+                self.overlay.blit(surface, (5, 5 + i * line_height))
+            self.overlay_source = self.overlay_lines
+        screen.blit(self.overlay, pos)
+
+    def open_csv(self, path):
+        # One row per frame; the header is written with the first row, once
+        # every section has been registered
+        self.csv_file = open(path, "w", newline="")
+
+    def start_cprofile(self, path):
+        self.pstats_path = path
+        self.cprofile = cProfile.Profile()
+        self.cprofile.enable()
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = self.csv_writer = None
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.pstats_path)
+            self.cprofile = None
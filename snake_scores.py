@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Persistent score history in SQLite (WAL mode). Every finished run is kept
+# with its score, length, duration, tick count, seed and replay. Writes are
+# queued and committed in batches by a background thread, so the game loop
+# never waits on the disk, and WAL plus a busy timeout lets several game
+# processes on one host record results into the same file safely.
+#
+# Without an explicit path the database lives in the user's data directory,
+# not in whatever directory the game was started from.
+
+log = logging.getLogger("snake_scores")
+
+DATABASE_NAME = "scores.db"
+LEGACY_HIGH_SCORE = "high_score.json"
+BATCH_SIZE = 64
+FLUSH_INTERVAL = 0.5
+BUSY_TIMEOUT = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    ticks INTEGER NOT NULL,
+    seed INTEGER,
+    replay BLOB
+);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC, played_at);
+"""
+
+INSERT = ("INSERT INTO runs (played_at, score, length, duration, ticks, seed, replay) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def default_path():
+    # %APPDATA%\snake\scores.db on Windows, else $XDG_DATA_HOME/snake/scores.db
+    # (~/.local/share by default)
+    if os.name == "nt" and os.environ.get("APPDATA"):
+        base = os.environ["APPDATA"]
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "snake", DATABASE_NAME)
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                 check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class ScoreStore:
+    def __init__(self, path=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        if path is None:
+            path = default_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.connection = connect(path)
+        self.connection.executescript(SCHEMA)
+        self.import_legacy_high_score()
+
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_loop, name="score-writer", daemon=True)
+        self.writer.start()
+
+    def import_legacy_high_score(self):
+        # One-off import of the old high_score.json, found next to the
+        # database or in the directory the game used to be run from
+        candidates = [os.path.join(os.path.dirname(os.path.abspath(self.path)), LEGACY_HIGH_SCORE),
+                      os.path.abspath(LEGACY_HIGH_SCORE)]
+        legacy = next((path for path in candidates if os.path.exists(path)), None)
+        if legacy is None:
+            return
+        try:
+            with open(legacy) as f:
+                score = int(json.load(f)["high_score"])
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            log.warning("ignoring unreadable %s: %s", legacy, exc)
+            return
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            (runs,) = self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()
+            if not runs and score > 0:
+                self.connection.execute(INSERT, (os.path.getmtime(legacy), score, 0, 0.0, 0, None, None))
+
+    def record(self, score, length, duration, ticks, seed=None, replay=None):
+        # Queues one finished run; returns immediately
+        self.pending.put((time.time(), score, length, duration, ticks, seed, replay))
+
+    def write_loop(self):
+        # Runs on the writer thread with its own connection
+        connection = connect(self.path)
+        closing = False
+        while not closing:
+            item = self.pending.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    closing = True
+                elif isinstance(item, threading.Event):
+                    self.write_batch(connection, batch)
+                    batch = []
+                    item.set()
+                else:
+                    batch.append(item)
+                if closing or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self.write_batch(connection, batch)
+        connection.close()
+
+    def write_batch(self, connection, batch):
+        if not batch:
+            return
+        try:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(INSERT, batch)
+        except sqlite3.Error as exc:
+            log.error("could not save %d runs to %s: %s", len(batch), self.path, exc)
+
+    def flush(self):
+        # Blocks until everything recorded so far is committed
+        done = threading.Event()
+        self.pending.put(done)
+        done.wait()
+
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+        self.connection.close()
+
+    def high_score(self):
+        (score,) = self.connection.execute("SELECT MAX(score) FROM runs").fetchone()
+        return score or 0
+
+    def top(self, n=10):
+        # Best runs first: (score, length, duration, ticks, seed, played_at)
+        return self.connection.execute(
+            "SELECT score, length, duration, ticks, seed, played_at FROM runs "
+            "ORDER BY score DESC, played_at LIMIT ?", (n,)).fetchall()
+
+    def replay(self, seed, score):
+        # Replay bytes of a recorded run, for re-verifying it
+        row = self.connection.execute(
+            "SELECT replay FROM runs WHERE seed = ? AND score = ? AND replay IS NOT NULL LIMIT 1",
+            (seed, score)).fetchone()
+        return row[0] if row else None
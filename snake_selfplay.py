@@ -0,0 +1,160 @@
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+from snake_engine import SnakeEngine, CELL_NUMBER_X, CELL_NUMBER_Y, DIRECTIONS, BODY
+
+# Runs many headless games over a process pool for evaluation and self-play.
+#
+# Each worker owns one slot of a shared memory block and writes its current
+# board there with SnakeEngine.observe() every tick, so observations are never
+# pickled. Only one small result tuple per game travels back to the parent.
+#
+# A policy is a picklable (module level) callable taking (observation, engine)
+# and returning a direction from snake_engine, or None to keep going straight.
+
+MAX_TICKS = 20000
+
+_worker = {}
+
+
+def greedy_policy(observation, engine):
+    # Step toward the food along moves that are not immediately deadly
+    if engine.food is None:
+        return None
+    food_x, food_y = engine.food_xy
+    best, best_distance = None, None
+    for dx, dy in DIRECTIONS:
+        x, y = engine.head_x + dx, engine.head_y + dy
+        if not 0 <= x < engine.width or not 0 <= y < engine.height:
+            continue
+        cell = y * engine.width + x
+        if observation[cell] == BODY and cell != engine.body[-1]:
+            continue
+        distance = abs(food_x - x) + abs(food_y - y)
+        if best_distance is None or distance < best_distance:
+            best, best_distance = (dx, dy), distance
+    return best
+
+
+def play_game(policy, seed, width=CELL_NUMBER_X, height=CELL_NUMBER_Y,
+              max_ticks=MAX_TICKS, observation=None):
+    # Plays one game the way Game.update does; returns (score, length, ticks, won)
+    engine = SnakeEngine(width, height, rng=random.Random(seed))
+    if observation is None:
+        observation = bytearray(width * height)
+    ticks = 0
+    while not engine.done and ticks < max_ticks:
+        engine.observe(observation)
+        engine.step(policy(observation, engine))
+        ticks += 1
+    return engine.score, len(engine.body), ticks, engine.won
+
+
+def _init_worker(shm_name, slots, width, height):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slot = slots.get()
+    size = width * height
+    _worker["shm"] = shm
+    _worker["observation"] = shm.buf[slot * size:(slot + 1) * size]
+
+
+def _play_chunk(args):
+    policy, seeds, width, height, max_ticks = args
+    observation = _worker["observation"]
+    return [play_game(policy, seed, width, height, max_ticks, observation) for seed in seeds]
+
+
+def summarize(results, elapsed):
+    # With no results (e.g. games=0) every statistic is zero
+    stats = {"games": len(results), "seconds": elapsed}
+    for index, name in enumerate(("score", "length", "ticks")):
+        values = [result[index] for result in results]
+        if not values:
+            stats[name] = {"mean": 0.0, "min": 0, "max": 0, "std": 0.0}
+            continue
+        mean = sum(values) / len(values)
+        stats[name] = {
+            "mean": mean,
+            "min": min(values),
+            "max": max(values),
+            "std": math.sqrt(sum((v - mean) ** 2 for v in values) / len(values)),
+        }
+    stats["wins"] = sum(result[3] for result in results)
+    stats["ticks_per_second"] = sum(result[2] for result in results) / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+class SelfPlayRunner:
+    def __init__(self, workers=None, width=CELL_NUMBER_X, height=CELL_NUMBER_Y):
+        self.workers = workers or os.cpu_count() or 1
+        self.width = width
+        self.height = height
+        size = width * height
+        self.shm = shared_memory.SharedMemory(create=True, size=size * self.workers)
+        slots = multiprocessing.Queue()
+        for slot in range(self.workers):
+            slots.put(slot)
+        self.pool = multiprocessing.Pool(
+            self.workers, _init_worker, (self.shm.name, slots, width, height))
+
+    def boards(self):
+        # Latest board written by each worker (live while a run is going)
+        size = self.width * self.height
+        return [bytes(self.shm.buf[slot * size:(slot + 1) * size]) for slot in range(self.workers)]
+
+    def run(self, policy, games, seed=0, max_ticks=MAX_TICKS):
+        # Plays `games` games with seeds seed .. seed + games - 1
+        seeds = range(seed, seed + games)
+        # A few chunks per worker keeps the pool busy without much pickling
+        chunk = max(1, math.ceil(games / (self.workers * 4)))
+        tasks = [(policy, seeds[i:i + chunk], self.width, self.height, max_ticks)
+                 for i in range(0, games, chunk)]
+        start = time.perf_counter()
+        results = []
+        for chunk_results in self.pool.imap_unordered(_play_chunk, tasks):
+            results.extend(chunk_results)
+        return summarize(results, time.perf_counter() - start)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def evaluate(policy, games, seed=0, workers=None, width=CELL_NUMBER_X,
+             height=CELL_NUMBER_Y, max_ticks=MAX_TICKS):
+    with SelfPlayRunner(workers, width, height) as runner:
+        return runner.run(policy, games, seed, max_ticks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a policy over many headless games")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    args = parser.parse_args()
+
+    stats = evaluate(greedy_policy, args.games, args.seed, args.workers, max_ticks=args.max_ticks)
+    print(f"{stats['games']} games in {stats['seconds']:.2f}s "
+          f"({stats['ticks_per_second']:,.0f} ticks/sec), {stats['wins']} won")
+    for name in ("score", "length", "ticks"):
+        values = stats[name]
+        print(f"{name:>7}: mean {values['mean']:.1f}  min {values['min']}  "
+              f"max {values['max']}  std {values['std']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import logging
+import random
+import struct
+import time
+
+from snake_arena import Arena, ArenaView, MOVE, DIE, SPAWN, FOOD_ADD, FOOD_REMOVE, SCORE
+from snake_engine import CELL_NUMBER_X, CELL_NUMBER_Y, DIRECTIONS, START_SPEED, is_reverse
+from snake_profile import percentile
+from snake_replay import write_varint, read_varint
+
+# Authoritative multiplayer server. One asyncio task steps a shared Arena
+# every `tick_ms` (Game.speed's starting value by default) and broadcasts
+# what changed; clients only send direction changes, which are queued like
+# key presses and applied on the next tick.
+#
+# Messages over TCP are framed as a 4-byte little-endian length followed by
+# a type byte and the payload:
+#
+#   WELCOME   player id, board width, height, tick ms    (server -> client)
+#   SNAPSHOT  tick, events rebuilding the whole board   (server -> client)
+#   DELTA     tick, events of one tick                  (server -> client)
+#   INPUT     direction index                           (client -> server)
+#
+# SNAPSHOT and DELTA share a layout: "<Id" tick and server send time, a varint
+# with the total length of all snakes (a cheap checksum a client can compare
+# with its own copy), then one varint per event, (kind | player << 3),
+# followed by the event's fields as varints. A MOVE is a head step and a grow
+# flag rather than coordinates, so a typical tick costs a few bytes a snake.
+#
+# Each tick's delta is encoded once and the same bytes are written to every
+# client. A client that cannot keep up (its unsent data exceeds
+# MAX_BUFFERED) is dropped rather than let the server queue without bound.
+
+log = logging.getLogger("snake_server")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BUFFERED = 256 * 1024
+MAX_MESSAGE = 1 << 20
+TIMING_WINDOW = 1000  # ticks kept for the tick time percentiles
+
+FRAME = struct.Struct("<IB")
+WELCOME = 1
+SNAPSHOT = 2
+DELTA = 3
+INPUT = 4
+
+WELCOME_BODY = struct.Struct("<IHHH")
+DELTA_HEADER = struct.Struct("<Id")
+
+
+def frame(kind, payload):
+    return FRAME.pack(len(payload) + 1, kind) + payload
+
+
+def encode_events(tick, events, total_length, sent_at=None):
+    out = bytearray(DELTA_HEADER.pack(tick, time.time() if sent_at is None else sent_at))
+    write_varint(out, total_length)
+    for event in events:
+        kind = event[0]
+        if kind == FOOD_ADD or kind == FOOD_REMOVE:
+            # No player; the cell follows
+            write_varint(out, kind)
+        else:
+            write_varint(out, kind | event[1] << 3)
+        if kind == MOVE:
+            write_varint(out, event[2] << 1 | event[3])
+        elif kind == SPAWN:
+            cells = event[3]
+            write_varint(out, event[2])
+            write_varint(out, len(cells))
+            for cell in cells:
+                write_varint(out, cell)
+        elif kind == FOOD_ADD or kind == FOOD_REMOVE:
+            write_varint(out, event[1])
+        elif kind == SCORE:
+            write_varint(out, event[2])
+    return out
+
+
+def decode_events(data):
+    # (tick, sent_at, total_length, events) from a SNAPSHOT or DELTA payload
+    tick, sent_at = DELTA_HEADER.unpack_from(data)
+    total_length, offset = read_varint(data, DELTA_HEADER.size)
+    events = []
+    while offset < len(data):
+        value, offset = read_varint(data, offset)
+        kind, player = value & 7, value >> 3
+        if kind == MOVE:
+            value, offset = read_varint(data, offset)
+            events.append((MOVE, player, value >> 1, bool(value & 1)))
+        elif kind == SPAWN:
+            direction, offset = read_varint(data, offset)
+            count, offset = read_varint(data, offset)
+            cells = []
+            for _ in range(count):
+                cell, offset = read_varint(data, offset)
+                cells.append(cell)
+            events.append((SPAWN, player, direction, cells))
+        elif kind == FOOD_ADD or kind == FOOD_REMOVE:
+            cell, offset = read_varint(data, offset)
+            events.append((kind, cell))
+        elif kind == SCORE:
+            score, offset = read_varint(data, offset)
+            events.append((SCORE, player, score))
+        else:
+            events.append((kind, player))
+    return tick, sent_at, total_length, events
+
+
+async def read_message(reader):
+    # (type, payload); raises asyncio.IncompleteReadError at end of stream
+    header = await reader.readexactly(FRAME.size)
+    length, kind = FRAME.unpack(header)
+    if not 1 <= length <= MAX_MESSAGE:
+        raise ValueError(f"bad message length {length}")
+    return kind, await reader.readexactly(length - 1)
+
+
+class ArenaServer:
+    def __init__(self, width=CELL_NUMBER_X, height=CELL_NUMBER_Y, tick_ms=START_SPEED, seed=None):
+        self.arena = Arena(width, height, rng=random.Random(seed))
+        self.tick_ms = tick_ms
+        self.clients = {}
+        self.tick_times = []
+        self.max_tick_ms = 0.0
+        self.late_ticks = 0
+        self.bytes_sent = 0
+        self.running = True
+
+    async def handle_client(self, reader, writer):
+        arena = self.arena
+        player = arena.join()
+        # Joins take effect on the next tick, so the snapshot sent now plus
+        # every delta after it gives the client the full board
+        writer.write(frame(WELCOME, WELCOME_BODY.pack(player, arena.width, arena.height, self.tick_ms)))
+        writer.write(frame(SNAPSHOT, encode_events(arena.tick, arena.snapshot(), arena.total_length())))
+        self.clients[player] = writer
+        log.info("player %d joined from %s (%d connected)", player,
+                 writer.get_extra_info("peername"), len(self.clients))
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == INPUT and len(payload) == 1 and payload[0] < len(DIRECTIONS):
+                    arena.queue_turn(player, DIRECTIONS[payload[0]])
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.drop(player)
+
+    def drop(self, player):
+        writer = self.clients.pop(player, None)
+        if writer is None:
+            return
+        self.arena.leave(player)
+        writer.close()
+        log.info("player %d left (%d connected)", player, len(self.clients))
+
+    def broadcast(self, message):
+        for player, writer in list(self.clients.items()):
+            if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                log.warning("dropping player %d: too far behind", player)
+                self.drop(player)
+                continue
+            writer.write(message)
+            self.bytes_sent += len(message)
+
+    def tick(self):
+        start = time.perf_counter()
+        events = self.arena.step()
+        message = frame(DELTA, encode_events(self.arena.tick, events, self.arena.total_length()))
+        self.broadcast(message)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.max_tick_ms = max(self.max_tick_ms, elapsed)
+        self.tick_times.append(elapsed)
+        if len(self.tick_times) > TIMING_WINDOW:
+            del self.tick_times[:-TIMING_WINDOW]
+
+    async def run_ticks(self):
+        # Ticks are scheduled against absolute deadlines so they do not drift;
+        # after a stall the missed ticks are skipped, not run back to back
+        loop = asyncio.get_running_loop()
+        interval = self.tick_ms / 1000
+        deadline = loop.time() + interval
+        while self.running:
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            self.tick()
+            deadline += interval
+            now = loop.time()
+            if now > deadline:
+                self.late_ticks += 1
+                deadline = now + interval
+
+    def summary(self):
+        times = sorted(self.tick_times)
+        return (f"tick {self.arena.tick}, {len(self.clients)} clients; tick time "
+                f"p50 {percentile(times, 0.50):.3f} ms, p99 {percentile(times, 0.99):.3f} ms, "
+                f"max {self.max_tick_ms:.3f} ms; {self.late_ticks} late; "
+                f"{self.bytes_sent / max(1, self.arena.tick):.0f} bytes sent per tick")
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, report_every=10.0):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        log.info("serving a %dx%d arena on %s:%d, %d ms ticks", self.arena.width, self.arena.height,
+                 host, port, self.tick_ms)
+        ticker = asyncio.create_task(self.run_ticks())
+        try:
+            async with server:
+                while True:
+                    await asyncio.sleep(report_every)
+                    log.info("%s", self.summary())
+        finally:
+            self.running = False
+            ticker.cancel()
+
+
+class BotClient:
+    # A load-test player: mirrors the board from the server's messages,
+    # checks it against the checksum, and steers greedily towards the nearest
+    # food while avoiding walls and bodies
+    def __init__(self, rng):
+        self.rng = rng
+        self.view = None
+        self.player = None
+        self.latencies = []
+        self.deltas = 0
+        self.delta_bytes = 0
+        self.desyncs = 0
+        self.deaths = 0
+
+    async def run(self, host, port, duration):
+        reader, writer = await asyncio.open_connection(host, port)
+        end = time.monotonic() + duration
+        try:
+            while time.monotonic() < end:
+                try:
+                    kind, payload = await asyncio.wait_for(read_message(reader), end - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if kind == WELCOME:
+                    self.player, width, height, _ = WELCOME_BODY.unpack(payload)
+                    self.view = ArenaView(width, height)
+                    continue
+                received = time.time()
+                tick, sent_at, total_length, events = decode_events(payload)
+                self.view.apply(events)
+                if total_length != self.view.total_length():
+                    self.desyncs += 1
+                if kind == DELTA:
+                    self.deltas += 1
+                    self.delta_bytes += len(payload) + FRAME.size
+                    self.latencies.append((received - sent_at) * 1000)
+                    self.deaths += sum(1 for event in events if event[0] == DIE and event[1] == self.player)
+                    direction = self.steer()
+                    if direction is not None:
+                        writer.write(frame(INPUT, bytes([DIRECTIONS.index(direction)])))
+        finally:
+            writer.close()
+
+    def steer(self):
+        view = self.view
+        body = view.bodies.get(self.player)
+        if not body:
+            return None
+        width, height = view.width, view.height
+        current = view.directions[self.player]
+        hy, hx = divmod(body[0], width)
+        best, best_distance = None, None
+        for direction in DIRECTIONS:
+            if is_reverse(direction, current):
+                continue
+            x, y = hx + direction[0], hy + direction[1]
+            if not (0 <= x < width and 0 <= y < height) or view.occupied[y * width + x]:
+                continue
+            distance = min((abs(x - food % width) + abs(y - food // width) for food in view.foods),
+                           default=0) + self.rng.random()
+            if best is None or distance < best_distance:
+                best, best_distance = direction, distance
+        return best if best != current else None
+
+
+async def load_test(host, port, clients, duration, seed):
+    rng = random.Random(seed)
+    bots = [BotClient(random.Random(rng.random())) for _ in range(clients)]
+    await asyncio.gather(*(bot.run(host, port, duration) for bot in bots))
+    latencies = sorted(latency for bot in bots for latency in bot.latencies)
+    deltas = sum(bot.deltas for bot in bots)
+    print(f"{clients} clients for {duration:.0f} s: {deltas} deltas, "
+          f"{sum(bot.delta_bytes for bot in bots) / max(1, deltas):.1f} bytes per delta")
+    print(f"delivery latency p50 {percentile(latencies, 0.50):.2f} ms, "
+          f"p99 {percentile(latencies, 0.99):.2f} ms, max {latencies[-1] if latencies else 0.0:.2f} ms")
+    print(f"{sum(bot.deaths for bot in bots)} deaths, {sum(bot.desyncs for bot in bots)} desyncs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multiplayer snake arena server and load tester")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the authoritative arena server")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--width", type=int, default=CELL_NUMBER_X)
+    serve.add_argument("--height", type=int, default=CELL_NUMBER_Y)
+    serve.add_argument("--tick-ms", type=int, default=START_SPEED)
+    serve.add_argument("--seed", type=int, default=None)
+    loadtest = commands.add_parser("loadtest", help="connect bot clients and report latency")
+    loadtest.add_argument("--host", default=DEFAULT_HOST)
+    loadtest.add_argument("--port", type=int, default=DEFAULT_PORT)
+    loadtest.add_argument("--clients", type=int, default=50)
+    loadtest.add_argument("--duration", type=float, default=10.0)
+    loadtest.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    if args.command == "serve":
+        server = ArenaServer(args.width, args.height, args.tick_ms, args.seed)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            print(server.summary())
+    else:
+        asyncio.run(load_test(args.host, args.port, args.clients, args.duration, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snake_batch import BatchSnakeEnv, check_parity
+from snake_engine import CELL_NUMBER_X, CELL_NUMBER_Y
+
+
+@pytest.mark.parametrize("width, height", [(CELL_NUMBER_X, CELL_NUMBER_Y), (6, 4)])
+def test_parity_with_engine(width, height):
+    # Raises on the first tick where a batch board and its engine disagree
+    check_parity(num_envs=8, ticks=500, width=width, height=height)
+
+
+def test_observation_buffer_is_reused():
+    env = BatchSnakeEnv(2, seed=0)
+    first = env.reset()
+    kept = first.copy()
+    second, _, _ = env.step([-1, -1])
+    assert second.base is first.base
+    assert (first == second).all()
+    assert not (kept == second).all()